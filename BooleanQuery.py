@@ -0,0 +1,343 @@
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+FIELDS = ("title", "author")
+
+# Parentheses, or any run of characters without spaces nor parentheses
+TOKEN_PATTERN = re.compile(r"\(|\)|[^\s()]+")
+
+
+class Term:
+    """
+    A node matching the documents containing a word, in all their data or in a single field.
+
+    Attributes:
+        word (str): The cleaned word.
+        field (str): The field searched ("title" or "author"), None for all the data of the documents.
+    """
+
+    def __init__(self, word, field=None):
+        self.word = word
+        self.field = field
+
+    def __repr__(self):
+        return f"{self.field}:{self.word}" if self.field else self.word
+
+
+class And:
+    """
+    A node matching the documents matched by all its children.
+
+    Attributes:
+        children (list): The child nodes, Not children are subtracted from the others.
+    """
+
+    def __init__(self, children):
+        self.children = children
+
+    def __repr__(self):
+        return f"({' AND '.join(map(repr, self.children))})"
+
+
+class Or:
+    """
+    A node matching the documents matched by any of its children.
+
+    Attributes:
+        children (list): The child nodes.
+    """
+
+    def __init__(self, children):
+        self.children = children
+
+    def __repr__(self):
+        return f"({' OR '.join(map(repr, self.children))})"
+
+
+class Not:
+    """
+    A node matching the documents not matched by its child.
+
+    Attributes:
+        child: The negated node.
+    """
+
+    def __init__(self, child):
+        self.child = child
+
+    def __repr__(self):
+        return f"NOT {self.child!r}"
+
+
+class Bool:
+    """
+    A node for a list of clauses: the documents must match all the required clauses (or, without any,
+    at least one of the optional clauses) and none of the excluded clauses.
+
+    Attributes:
+        must (list): The required clauses (+term).
+        should (list): The optional clauses.
+        must_not (list): The excluded clauses (-term or NOT term).
+    """
+
+    def __init__(self, must=None, should=None, must_not=None):
+        self.must = must or []
+        self.should = should or []
+        self.must_not = must_not or []
+
+    def __repr__(self):
+        clauses = ([f"+{c!r}" for c in self.must] + [repr(c) for c in self.should]
+                   + [f"-{c!r}" for c in self.must_not])
+        return f"[{' '.join(clauses)}]"
+
+
+class QueryParser:
+    """
+    A class to parse the boolean query language into a tree of nodes.
+
+    The language supports AND, OR and NOT (in uppercase, AND binding tighter than OR), parentheses,
+    +required and -excluded clauses, and the title: and author: field restrictions.
+    Clauses without operator between them are optional, as in a plain bag of words query.
+
+    Attributes:
+        tokenize (Callable): The function splitting a query word into indexed words (Corpus.tokenize).
+    """
+
+    def __init__(self, tokenize: Callable[[str], List[str]]):
+        """
+        Constructs all the necessary attributes for the QueryParser object.
+
+        Args:
+            tokenize (Callable): The function splitting a query word into indexed words.
+        """
+        self.tokenize = tokenize
+        self.tokens: List[str] = []
+        self.position = 0
+
+    def parse(self, query: str) -> Bool:
+        """
+        Parses a query.
+
+        Args:
+            query (str): The query.
+
+        Returns:
+            Bool: The root node of the query.
+
+        Raises:
+            ValueError: If the parentheses of the query are unbalanced.
+        """
+        self.tokens = TOKEN_PATTERN.findall(query)
+        self.position = 0
+        root = self._parse_clauses()
+        if self.position < len(self.tokens):
+            raise ValueError(f"Unexpected {self.tokens[self.position]!r} in query {query!r}")
+        return root
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _next(self):
+        token = self._peek()
+        self.position += 1
+        return token
+
+    def _parse_clauses(self) -> Bool:
+        root = Bool()
+        while self._peek() not in (None, ")"):
+            modifier = None
+            if self._peek() in ("+", "-"):
+                modifier = self._next()
+            elif self._peek()[0] in "+-" and len(self._peek()) > 1:
+                modifier = self._peek()[0]
+                self.tokens[self.position] = self._peek()[1:]
+            node = self._parse_or()
+            if node is None:
+                continue
+            if isinstance(node, Not) and modifier is None:
+                modifier, node = "-", node.child
+            if modifier == "+":
+                root.must.append(node)
+            elif modifier == "-":
+                root.must_not.append(node)
+            else:
+                root.should.append(node)
+        return root
+
+    def _parse_or(self):
+        children = [self._parse_and()]
+        while self._peek() == "OR":
+            self._next()
+            children.append(self._parse_and())
+        children = [child for child in children if child is not None]
+        return children[0] if len(children) == 1 else Or(children) if children else None
+
+    def _parse_and(self):
+        children = [self._parse_unary()]
+        while self._peek() == "AND":
+            self._next()
+            children.append(self._parse_unary())
+        children = [child for child in children if child is not None]
+        return children[0] if len(children) == 1 else And(children) if children else None
+
+    def _parse_unary(self):
+        if self._peek() == "NOT":
+            self._next()
+            child = self._parse_unary()
+            return Not(child) if child is not None else None
+        return self._parse_primary()
+
+    def _parse_primary(self):
+        token = self._next()
+        if token is None:
+            return None
+        if token == "(":
+            node = self._parse_clauses()
+            if self._next() != ")":
+                raise ValueError("Missing closing parenthesis in query")
+            if not node.must and not node.must_not:
+                return node.should[0] if len(node.should) == 1 else Or(node.should) if node.should else None
+            return node
+        if token == ")":
+            raise ValueError("Unexpected closing parenthesis in query")
+        field, _, word = token.partition(":")
+        if field not in FIELDS or not word:
+            field, word = None, token
+        # A query word can hold several indexed words (e.g. "covid-19"), stop words are dropped
+        terms = [Term(w, field) for w in self.tokenize(word)]
+        return terms[0] if len(terms) == 1 else And(terms) if terms else None
+
+
+class QueryPlanner:
+    """
+    A class to find the documents matching a query tree, from the postings of its terms.
+
+    The intersections are done from the cheapest to the most expensive node (by document frequency)
+    and stop as soon as they are empty, and the exclusions are subtracted with a boolean mask.
+
+    Attributes:
+        postings (Callable): The function giving the sorted indexes of the documents containing a word in a field.
+        ndoc (int): The number of documents.
+    """
+
+    def __init__(self, postings: Callable[[str, Optional[str]], np.ndarray], ndoc: int):
+        """
+        Constructs all the necessary attributes for the QueryPlanner object.
+
+        Args:
+            postings (Callable): The function giving the postings of a (word, field) pair.
+            ndoc (int): The number of documents.
+        """
+        self.postings = postings
+        self.ndoc = ndoc
+        self._cache: Dict[Tuple[str, Optional[str]], np.ndarray] = {}
+
+    def term_postings(self, term: Term) -> np.ndarray:
+        """
+        Gets the postings of a term, fetching them once per query.
+
+        Args:
+            term (Term): The term.
+
+        Returns:
+            numpy.ndarray: The sorted indexes of the documents containing the term.
+        """
+        key = (term.word, term.field)
+        if key not in self._cache:
+            self._cache[key] = self.postings(term.word, term.field)
+        return self._cache[key]
+
+    def cost(self, node) -> int:
+        """
+        Estimates the number of documents matched by a node, without evaluating it.
+
+        Args:
+            node: The node.
+
+        Returns:
+            int: An upper bound of the number of matched documents.
+        """
+        if isinstance(node, Term):
+            return len(self.term_postings(node))
+        if isinstance(node, Not):
+            return self.ndoc - self.cost(node.child)
+        if isinstance(node, And):
+            return min((self.cost(c) for c in node.children if not isinstance(c, Not)), default=self.ndoc)
+        if isinstance(node, Or):
+            return min(sum(self.cost(c) for c in node.children), self.ndoc)
+        if node.must:
+            return min(self.cost(c) for c in node.must)
+        if node.should:
+            return min(sum(self.cost(c) for c in node.should), self.ndoc)
+        return self.ndoc if node.must_not else 0
+
+    def execute(self, node) -> np.ndarray:
+        """
+        Finds the documents matched by a node.
+
+        Args:
+            node: The node.
+
+        Returns:
+            numpy.ndarray: The sorted indexes of the matched documents.
+        """
+        if isinstance(node, Term):
+            return self.term_postings(node)
+        if isinstance(node, Not):
+            return self._subtract(np.arange(self.ndoc), [node.child])
+        if isinstance(node, And):
+            return self._intersect([c for c in node.children if not isinstance(c, Not)],
+                                   [c.child for c in node.children if isinstance(c, Not)])
+        if isinstance(node, Or):
+            return self._union(node.children)
+        if node.must:
+            return self._intersect(node.must, node.must_not)
+        if node.should:
+            return self._subtract(self._union(node.should), node.must_not)
+        if node.must_not:
+            return self._subtract(np.arange(self.ndoc), node.must_not)
+        # No term left, e.g. an empty or stop words only query
+        return np.array([], dtype=np.int64)
+
+    def _intersect(self, children, excluded) -> np.ndarray:
+        if not children:
+            return self._subtract(np.arange(self.ndoc), excluded)
+        result = None
+        for child in sorted(children, key=self.cost):
+            matches = self.execute(child)
+            result = matches if result is None else np.intersect1d(result, matches, assume_unique=True)
+            if not len(result):
+                return result
+        return self._subtract(result, excluded)
+
+    def _union(self, children) -> np.ndarray:
+        return np.unique(np.concatenate([self.execute(c) for c in children] or [np.array([], dtype=np.int64)]))
+
+    def _subtract(self, matches, excluded) -> np.ndarray:
+        if not excluded or not len(matches):
+            return matches
+        mask = np.zeros(self.ndoc, dtype=bool)
+        mask[matches] = True
+        for child in excluded:
+            mask[self.execute(child)] = False
+        return np.flatnonzero(mask)
+
+
+def positive_terms(node) -> List[Term]:
+    """
+    Gets the terms of a query tree that are not negated, used to score the matched documents.
+
+    Args:
+        node: The root node of the query.
+
+    Returns:
+        list: The positive terms.
+    """
+    if isinstance(node, Term):
+        return [node]
+    if isinstance(node, Not):
+        return []
+    children = node.must + node.should if isinstance(node, Bool) else node.children
+    return [term for child in children for term in positive_terms(child)]
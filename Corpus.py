@@ -1,8 +1,11 @@
 import re
+import numpy as np
 from pandas import DataFrame
 from scipy.sparse import csr_matrix
 from Author import Author
 from Document import Document
+from IndexBuilder import update_tf_matrix
+from Tokenizer import ENGLISH_STOP_WORDS, TOKEN_PATTERN, clean_text, tokenize
 
 class Corpus:
     """
@@ -16,16 +19,23 @@ class Corpus:
         Cached_doc_string_list (str): A cached string of all document data.
         Ndoc (int): The number of documents in the corpus.
         Naut (int): The number of authors in the corpus.
+        Stop_words (frozenset): The words left out of the vocabulary and of the term frequency matrix.
     """
 
-    def __init__(self, nom):
+    # Default for the corpora pickled before stop words were configurable
+    stop_words = frozenset()
+
+    def __init__(self, nom, stop_words=None):
         """
         Constructs all the necessary attributes for the Corpus object.
 
         Args:
             nom (str): The name of the corpus.
+            stop_words (Iterable[str], optional): The words to leave out of the index, for example ENGLISH_STOP_WORDS.
+                Defaults to no stop words.
         """
         self.nom = nom
+        self.stop_words = frozenset(stop_words or ())
         self.authors = {}
         self.aut2id = {}
         self.id2doc = {}
@@ -100,8 +110,19 @@ class Corpus:
         Returns:
             str: The cleaned text.
         """
-        text = text.lower().replace("\n", " ")
-        return re.sub(r"[^a-zà-ÿ@^\s]", " ", text).strip()
+        return clean_text(text)
+
+    def tokenize(self, text: str):
+        """
+        Splits the text into the cleaned words kept in the index, leaving out the stop words.
+
+        Args:
+            text (str): The text to tokenize.
+
+        Returns:
+            list: The indexed words of the text.
+        """
+        return tokenize(text, self.stop_words)
 
     def stats(self):
         """
@@ -143,7 +164,7 @@ class Corpus:
         """
         if not self.cached_doc_string_list:
             self.refresh_cache()
-        vocab = {word for doc in self.id2doc.values() for word in self.clean_text(doc.get_data()).split()}
+        vocab = {word for doc in self.id2doc.values() for word in self.tokenize(doc.get_data())}
         return sorted(vocab)
 
     def get_tf_matrix(self):
@@ -157,12 +178,54 @@ class Corpus:
         vocab2id = {word: i for i, word in enumerate(vocab)}
         rows, cols, data = [], [], []
         for i, doc in self.id2doc.items():
-            for word in self.clean_text(doc.get_data()).split():
+            for word in self.tokenize(doc.get_data()):
                 rows.append(i - 1)
                 cols.append(vocab2id[word])
                 data.append(1)
         return csr_matrix((data, (rows, cols)), shape=(len(self.id2doc), len(vocab)))
 
+    def get_index(self, n_jobs=1, chunk_size=10000, previous=None, delta=()):
+        """
+        Gets the vocabulary and the term frequency matrix of the corpus in a single pass over the documents,
+        optionally counting chunks of documents in parallel and reusing a previous index
+        (see IndexBuilder.update_tf_matrix).
+
+        Args:
+            n_jobs (int, optional): The number of worker processes, None for the number of CPUs.
+                Defaults to 1 (no worker process).
+            chunk_size (int, optional): The number of documents per chunk. Defaults to 10000.
+            previous (tuple, optional): A previous index of the corpus, as returned by this method.
+                Defaults to None (every document is counted).
+            delta (list, optional): The documents to count again even if the previous index holds them,
+                e.g. FetchCache.delta. Defaults to none.
+
+        Returns:
+            tuple: The stop words, the keys of the documents, the sorted list of unique words in the corpus
+                and the term frequency matrix.
+        """
+        delta = {id(doc) for doc in delta}
+        stale = [i for i, doc in enumerate(self.id2doc.values()) if id(doc) in delta]
+        texts = (doc.get_data() for doc in self.id2doc.values())
+        return update_tf_matrix(texts, previous, stale, self.stop_words, n_jobs, chunk_size)
+
+    def get_token_offsets(self):
+        """
+        Gets the tokens of the body of each document with their character offsets.
+
+        Returns:
+            dict: A dictionary mapping document IDs to a tuple of the list of tokens,
+                the array of their start offsets and the array of their end offsets in the body.
+        """
+        offsets = {}
+        for i, doc in self.id2doc.items():
+            matches = list(TOKEN_PATTERN.finditer(doc.body))
+            offsets[i] = (
+                [match.group().lower() for match in matches],
+                np.fromiter((match.start() for match in matches), dtype=np.int64, count=len(matches)),
+                np.fromiter((match.end() for match in matches), dtype=np.int64, count=len(matches)),
+            )
+        return offsets
+
     def show(self, n_docs=-1, tri="abc"):
         """
         Displays the documents in the corpus.
@@ -0,0 +1,228 @@
+import copy
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from Author import Author
+from Document import Document
+
+
+class CacheEntry:
+    """
+    A class to represent a cached item fetched from a source.
+
+    Attributes:
+        digest (str): The SHA-256 digest of the raw item, used as its key in the blob store.
+        fetched_at (float): The timestamp of the last fetch of the item.
+        updated_at (str): The last update date of the item given by the source, if any.
+        document (Document): The document parsed from the item.
+    """
+    digest: str
+    fetched_at: float
+    updated_at: Optional[str]
+    document: Document
+
+    def __init__(self, digest, fetched_at, updated_at, document):
+        self.digest = digest
+        self.fetched_at = fetched_at
+        self.updated_at = updated_at
+        self.document = document
+
+    def __getstate__(self):
+        # The document is saved with a bare author, not with the shared author and all its other documents
+        state = self.__dict__.copy()
+        state["document"] = copy.copy(self.document)
+        state["document"].author = Author(self.document.author.name)
+        return state
+
+
+class FetchCache:
+    """
+    A class to represent a persistent, content-addressed cache of the items fetched from reddit and arXiv.
+
+    The raw items are stored once by digest, the entries map a source and a remote ID to the digest of the last
+    version of the item and to the document parsed from it, so a rebuild only parses the new or changed items.
+    The listings (the remote IDs returned for a subject, newest first) are cached too: they are reused without
+    any network access while they are younger than max_age, and can give the newest cached item from which
+    the next fetch only asks for newer items.
+
+    Attributes:
+        path (str): The path of the cache file, None for an in-memory cache.
+        max_age (float): The number of seconds a listing can be reused without fetching it again.
+        evict_after (float): The number of seconds after which an unused listing is dropped,
+            with the items only it refers to.
+        blobs (dict): A dictionary mapping digests to raw items.
+        entries (dict): A dictionary mapping (source, remote ID) tuples to CacheEntry objects.
+        listings (dict): A dictionary mapping (source, subject) tuples to the fetch timestamp, the number of items
+            requested and the list of (remote ID, digest) tuples of the listing.
+        new (list): The (source, remote ID) keys of the items seen for the first time since the cache was loaded.
+        changed (list): The (source, remote ID) keys of the items that changed since the cache was loaded.
+        reused (list): The (source, remote ID) keys of the unchanged items since the cache was loaded.
+    """
+
+    def __init__(self, path: Optional[str] = "fetch_cache.pkl", max_age=600, evict_after=30 * 24 * 3600):
+        """
+        Constructs all the necessary attributes for the FetchCache object, loading the cache file if it exists.
+
+        Args:
+            path (str, optional): The path of the cache file, None for an in-memory cache.
+                Defaults to "fetch_cache.pkl".
+            max_age (float, optional): The number of seconds a listing can be reused. Defaults to 600.
+            evict_after (float, optional): The number of seconds after which an unused listing is dropped.
+                Defaults to 30 days.
+        """
+        self.path = path
+        self.max_age = max_age
+        self.evict_after = evict_after
+        self.blobs: Dict[str, dict] = {}
+        self.entries: Dict[Tuple[str, str], CacheEntry] = {}
+        self.listings: Dict[Tuple[str, str], Tuple[float, int, List[Tuple[str, str]]]] = {}
+        self.new, self.changed, self.reused = [], [], []
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                self.blobs, self.entries, self.listings = pickle.load(f)
+
+    @staticmethod
+    def digest(item: dict) -> str:
+        """
+        Computes the content digest of a raw item.
+
+        Args:
+            item (dict): The raw item.
+
+        Returns:
+            str: The SHA-256 digest of the canonical JSON serialization of the item.
+        """
+        return hashlib.sha256(json.dumps(item, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def cached_listing(self, source: str, subject: str, nb: int):
+        """
+        Gets a cached listing, whatever its age.
+
+        Args:
+            source (str): The source of the listing.
+            subject (str): The subject of the listing.
+            nb (int): The number of items requested.
+
+        Returns:
+            list: The list of (remote ID, raw item) tuples of the listing, newest first,
+                empty if it is not cached or was fetched for fewer items.
+        """
+        with self._lock:
+            listing = self.listings.get((source, subject))
+            if listing is None or listing[1] < nb:
+                return []
+            return [(remote_id, self.blobs[digest]) for remote_id, digest in listing[2][:nb]]
+
+    def get_listing(self, source: str, subject: str, nb: int):
+        """
+        Gets a cached listing if it is younger than max_age.
+
+        Args:
+            source (str): The source of the listing.
+            subject (str): The subject of the listing.
+            nb (int): The number of items requested.
+
+        Returns:
+            list: The list of (remote ID, raw item) tuples of the listing, None if it must be fetched again.
+        """
+        with self._lock:
+            listing = self.listings.get((source, subject))
+            if listing is None or time.time() - listing[0] > self.max_age:
+                return None
+        return self.cached_listing(source, subject, nb) or None
+
+    def update_listing(self, source: str, subject: str, nb: int, fetched: List[Tuple[str, dict]], complete=False):
+        """
+        Stores the newest items of a listing in front of the cached ones.
+
+        Args:
+            source (str): The source of the listing.
+            subject (str): The subject of the listing.
+            nb (int): The number of items requested.
+            fetched (list): The list of (remote ID, raw item) tuples fetched, newest first.
+            complete (bool, optional): Whether the fetched items are the whole listing, replacing the cached ones.
+                Defaults to False.
+
+        Returns:
+            list: The list of (remote ID, raw item) tuples of the updated listing, newest first.
+        """
+        fetched_ids = {remote_id for remote_id, _ in fetched}
+        cached = [] if complete else self.cached_listing(source, subject, nb)
+        items = fetched + [(remote_id, item) for remote_id, item in cached if remote_id not in fetched_ids]
+        items = items[:nb]
+        with self._lock:
+            ids = []
+            for remote_id, item in items:
+                digest = self.digest(item)
+                self.blobs.setdefault(digest, item)
+                ids.append((remote_id, digest))
+            self.listings[(source, subject)] = (time.time(), nb, ids)
+        return items
+
+    def refresh(self, source: str, remote_id: str, item: dict, parse: Callable[[dict], Document],
+                updated_at: Optional[str] = None) -> Document:
+        """
+        Gets the document of an item, only parsing it when it is new or changed.
+
+        Args:
+            source (str): The source of the item.
+            remote_id (str): The ID of the item in the source.
+            item (dict): The raw item.
+            parse (Callable): The function building the document from the raw item.
+            updated_at (str, optional): The last update date of the item given by the source.
+
+        Returns:
+            Document: The document of the item.
+        """
+        key = (source, remote_id)
+        digest = self.digest(item)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.digest == digest:
+                entry.fetched_at = time.time()
+                self.reused.append(key)
+                return entry.document
+        document = parse(item)
+        with self._lock:
+            (self.new if entry is None else self.changed).append(key)
+            self.blobs.setdefault(digest, item)
+            self.entries[key] = CacheEntry(digest, time.time(), updated_at, document)
+        return document
+
+    @property
+    def delta(self) -> List[Document]:
+        """
+        Gets the documents of the new and changed items since the cache was loaded.
+
+        Returns:
+            list: The documents to index.
+        """
+        return [self.entries[key].document for key in self.new + self.changed]
+
+    def save(self):
+        """
+        Saves the cache to its file, evicting the unused listings, the items no listing refers to
+        and the raw items no longer referenced.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            now = time.time()
+            self.listings = {key: listing for key, listing in self.listings.items()
+                             if now - listing[0] <= self.evict_after}
+            listed = {(source, remote_id) for (source, _), (_, _, ids) in self.listings.items()
+                      for remote_id, _ in ids}
+            self.entries = {key: entry for key, entry in self.entries.items() if key in listed}
+            used = {entry.digest for entry in self.entries.values()}
+            used.update(digest for _, _, ids in self.listings.values() for _, digest in ids)
+            self.blobs = {digest: item for digest, item in self.blobs.items() if digest in used}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump((self.blobs, self.entries, self.listings), f)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,230 @@
+import concurrent.futures
+import hashlib
+import itertools
+import os
+from collections import deque
+from typing import Collection, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from Tokenizer import tokenize
+
+
+def count_chunk(texts: List[str], stop_words: FrozenSet[str] = frozenset()) -> Tuple[np.ndarray, csr_matrix]:
+    """
+    Counts the words of a chunk of documents against a local vocabulary.
+
+    Args:
+        texts (List[str]): The texts of the documents of the chunk.
+        stop_words (FrozenSet[str], optional): The words to leave out. Defaults to no stop words.
+
+    Returns:
+        tuple: The sorted local vocabulary of the chunk (an object array) and its term frequency matrix
+            over this vocabulary.
+    """
+    word_ids, cols, lengths = {}, [], np.zeros(len(texts), dtype=np.int64)
+    for i, text in enumerate(texts):
+        words = tokenize(text, stop_words)
+        cols.extend(word_ids.setdefault(word, len(word_ids)) for word in words)
+        lengths[i] = len(words)
+    # Object arrays of the distinct words, not fixed width arrays sized by the longest token
+    vocab, rank = sort_words(word_ids)
+    rows = np.repeat(np.arange(len(texts)), lengths)
+    data = np.ones(len(cols), dtype=np.int64)
+    return vocab, csr_matrix((data, (rows, rank[np.array(cols, dtype=np.int64)])), shape=(len(texts), len(vocab)))
+
+
+def sort_words(word_ids: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sorts a vocabulary numbered in order of appearance.
+
+    Args:
+        word_ids (dict): A dictionary mapping the words to consecutive IDs.
+
+    Returns:
+        tuple: The sorted words (an object array) and the rank in this order of each ID.
+    """
+    words = np.empty(len(word_ids), dtype=object)
+    words[:] = list(word_ids)
+    order = np.argsort(words, kind="stable")
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    return words[order], rank
+
+
+class IndexMerger:
+    """
+    A class to merge the term frequency matrices of chunks of documents as they are counted.
+
+    Only the local vocabulary, the column indices and the counts of each chunk are kept when it is added.
+    The vocabularies are merged at the end with np.unique, and the columns of each chunk are remapped
+    with np.searchsorted: both vocabularies are sorted, so the column indices of each row stay sorted.
+
+    Attributes:
+        vocabs (list): The sorted local vocabularies of the chunks, as object arrays.
+        indices (list): The local column indices of the chunks.
+        data (list): The counts of the chunks.
+        row_lengths (list): The number of distinct words of each document of the chunks.
+    """
+
+    def __init__(self):
+        """
+        Constructs all the necessary attributes for the IndexMerger object.
+        """
+        self.vocabs: List[np.ndarray] = []
+        self.indices: List[np.ndarray] = []
+        self.data: List[np.ndarray] = []
+        self.row_lengths: List[np.ndarray] = []
+
+    def add(self, local_vocab, block: csr_matrix):
+        """
+        Adds the next chunk of documents.
+
+        Args:
+            local_vocab: The sorted local vocabulary of the chunk.
+            block (csr_matrix): The term frequency matrix of the chunk over its local vocabulary.
+        """
+        words = np.empty(len(local_vocab), dtype=object)
+        words[:] = list(local_vocab)
+        self.vocabs.append(words)
+        self.indices.append(block.indices)
+        self.data.append(block.data)
+        self.row_lengths.append(np.diff(block.indptr))
+
+    def result(self) -> Tuple[List[str], csr_matrix]:
+        """
+        Gets the merged index.
+
+        Returns:
+            tuple: The sorted vocabulary and the term frequency matrix of all the documents added.
+        """
+        if not self.row_lengths:
+            return [], csr_matrix((0, 0), dtype=np.int64)
+        vocab = np.unique(np.concatenate(self.vocabs))
+        indices = np.concatenate([np.searchsorted(vocab, local_vocab)[local_indices]
+                                  for local_vocab, local_indices in zip(self.vocabs, self.indices)])
+        row_lengths = np.concatenate(self.row_lengths)
+        indptr = np.concatenate([[0], np.cumsum(row_lengths)])
+        matrix = csr_matrix((np.concatenate(self.data), indices, indptr), shape=(len(row_lengths), len(vocab)))
+        return vocab.tolist(), matrix
+
+
+def merge_chunks(chunks: Iterable[Tuple[np.ndarray, csr_matrix]]) -> Tuple[List[str], csr_matrix]:
+    """
+    Merges the local vocabularies of the chunks and stacks their term frequency matrices.
+
+    Args:
+        chunks (Iterable): The (local vocabulary, term frequency matrix) tuples of the chunks, in document order.
+
+    Returns:
+        tuple: The sorted vocabulary and the term frequency matrix of all the documents.
+    """
+    merger = IndexMerger()
+    for local_vocab, block in chunks:
+        merger.add(local_vocab, block)
+    return merger.result()
+
+
+def build_tf_matrix(texts: Iterable[str], stop_words: FrozenSet[str] = frozenset(), n_jobs=None,
+                    chunk_size=10000) -> Tuple[List[str], csr_matrix]:
+    """
+    Builds the vocabulary and the term frequency matrix of documents, counting chunks of documents in parallel.
+
+    The texts are read lazily, at most two chunks per worker are in flight at once and each counted chunk
+    is merged as soon as it is done, so besides the index itself the memory is bounded by the chunks in flight.
+
+    Args:
+        texts (Iterable[str]): The texts of the documents, e.g. a generator.
+        stop_words (FrozenSet[str], optional): The words to leave out. Defaults to no stop words.
+        n_jobs (int, optional): The number of worker processes, 1 to count in the current process.
+            Defaults to the number of CPUs.
+        chunk_size (int, optional): The number of documents per chunk. Defaults to 10000.
+
+    Returns:
+        tuple: The sorted vocabulary and the term frequency matrix of the documents.
+    """
+    stop_words = frozenset(stop_words)
+    texts = iter(texts)
+    chunks = iter(lambda: list(itertools.islice(texts, chunk_size)), [])
+    if n_jobs == 1:
+        return merge_chunks(count_chunk(chunk, stop_words) for chunk in chunks)
+    n_jobs = n_jobs or os.cpu_count() or 1
+    merger = IndexMerger()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        in_flight = deque()
+        for chunk in chunks:
+            if len(in_flight) >= 2 * n_jobs:
+                merger.add(*in_flight.popleft().result())
+            in_flight.append(executor.submit(count_chunk, chunk, stop_words))
+        while in_flight:
+            merger.add(*in_flight.popleft().result())
+    return merger.result()
+
+
+def document_key(text: str) -> str:
+    """
+    Computes the key of a document in an index, from its indexed text.
+
+    Args:
+        text (str): The indexed text of the document.
+
+    Returns:
+        str: The SHA-1 digest of the text.
+    """
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def update_tf_matrix(texts: Iterable[str], previous: Optional[Tuple] = None, stale: Collection[int] = (),
+                     stop_words: FrozenSet[str] = frozenset(), n_jobs=None,
+                     chunk_size=10000) -> Tuple[FrozenSet[str], List[str], List[str], csr_matrix]:
+    """
+    Builds the index of documents from a previous index, only counting the documents it does not hold.
+
+    The rows of the previous index are reused for the documents with the same key, the other documents
+    and the stale ones are counted (see build_tf_matrix) and their vocabulary is merged with the previous one.
+    A previous index built with other stop words is not reused at all.
+
+    Args:
+        texts (Iterable[str]): The texts of the documents, e.g. a generator.
+        previous (tuple, optional): The previous index, as returned by this function.
+            Defaults to None (every document is counted).
+        stale (Collection[int], optional): The positions of the documents to count again whatever their key,
+            e.g. the new and changed documents of a fetch. Defaults to none.
+        stop_words (FrozenSet[str], optional): The words to leave out. Defaults to no stop words.
+        n_jobs (int, optional): The number of worker processes, 1 to count in the current process.
+            Defaults to the number of CPUs.
+        chunk_size (int, optional): The number of documents per chunk. Defaults to 10000.
+
+    Returns:
+        tuple: The stop words, the keys of the documents, the sorted vocabulary and the term frequency matrix
+            of the documents.
+    """
+    stop_words = frozenset(stop_words)
+    if previous is not None and previous[0] != stop_words:
+        previous = None
+    _, previous_keys, previous_vocab, previous_matrix = previous or (stop_words, [], [],
+                                                                     csr_matrix((0, 0), dtype=np.int64))
+    previous_rows = {key: row for row, key in enumerate(previous_keys)}
+    stale = set(stale)
+    keys, reused, counted = [], [], []
+
+    def texts_to_count():
+        for i, text in enumerate(texts):
+            key = document_key(text)
+            keys.append(key)
+            if key in previous_rows and i not in stale:
+                reused.append(i)
+            else:
+                counted.append(i)
+                yield text
+
+    counted_vocab, counted_matrix = build_tf_matrix(texts_to_count(), stop_words, n_jobs, chunk_size)
+    rows = np.array([previous_rows[keys[i]] for i in reused], dtype=np.int64)
+    vocab, matrix = merge_chunks([(previous_vocab, previous_matrix[rows]), (counted_vocab, counted_matrix)])
+    if not len(vocab):
+        return stop_words, keys, [], csr_matrix((len(keys), 0), dtype=np.int64)
+    # Back to the order of the documents, without the words only found in the documents left out
+    matrix = matrix[np.argsort(np.array(reused + counted, dtype=np.int64), kind="stable")]
+    used = np.flatnonzero(np.bincount(matrix.indices, minlength=len(vocab)))
+    return stop_words, keys, [vocab[i] for i in used], matrix[:, used].tocsr()
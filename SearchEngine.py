@@ -1,7 +1,11 @@
+import html
+
 import numpy as np
-from pandas import DataFrame
-from tqdm import tqdm
+from pandas import DataFrame, Series, to_datetime
+from scipy.sparse import csc_matrix, csr_matrix
+from BooleanQuery import QueryParser, QueryPlanner, positive_terms
 from Corpus import Corpus
+from IndexBuilder import build_tf_matrix
 
 def cosine_similarity(vec1, vec2):
     """
@@ -24,23 +28,73 @@ class SearchEngine:
     A class to represent a search engine.
 
     Attributes:
-        term_freq_matrix (csr_matrix): The term frequency matrix of the corpus.
+        term_freq_matrix (csr_matrix): The term frequency matrix of the corpus, without the pruned postings.
         vocab (list): The vocabulary of the corpus.
+        vocab2id (dict): A dictionary mapping words to their index in the vocabulary.
         corpus (Corpus): The corpus used by the search engine.
-        doc_vectors (numpy.ndarray): The TF-IDF vectors of the documents in the corpus.
+        idf (numpy.ndarray): The inverse document frequency of each term, computed before pruning.
+        doc_vectors (csr_matrix): The TF-IDF vectors of the documents in the corpus.
+        term_postings (csc_matrix): The TF-IDF matrix by term, to read the postings of the query terms.
+        doc_norms (numpy.ndarray): The norm of the TF-IDF vector of each document, computed before pruning.
+        doc_lengths (numpy.ndarray): The number of words of the body of each document.
+        sources (numpy.ndarray): The sorted distinct sources of the documents.
+        source_codes (numpy.ndarray): The index in sources of the source of each document.
+        authors (numpy.ndarray): The sorted distinct author names of the documents.
+        author_codes (numpy.ndarray): The index in authors of the author of each document.
+        months (numpy.ndarray): The sorted distinct publication months ("YYYY-MM" or "unknown") of the documents.
+        month_codes (numpy.ndarray): The index in months of the publication month of each document.
+        field_index (dict): A dictionary mapping the "title" and "author" fields to their vocabulary
+            (a dictionary mapping words to their index) and their term frequency matrix by term.
+        pruning_stats (dict): The number of postings before and after the static pruning.
+        pruned_postings (csc_matrix): The documents of the postings dropped by the static pruning, by term,
+            used by the boolean matching but not by the scoring.
+        token_offsets (dict): A dictionary mapping document IDs to the vocabulary indexes of the tokens of their body,
+            with the start and end offsets of each token, used to build the snippets.
     """
 
-    def __init__(self, corpus: Corpus):
+    def __init__(self, corpus: Corpus, prune_threshold=0.0, n_jobs=1, index=None):
         """
         Initialize the search engine with a given corpus.
 
         Args:
             corpus (Corpus): The corpus to use for the search engine.
+            prune_threshold (float, optional): The minimum contribution of a posting to the cosine similarity
+                of its document, the postings below it are dropped from the index. Defaults to 0 (no pruning).
+            n_jobs (int, optional): The number of worker processes building the index, None for the number of CPUs.
+                Defaults to 1 (no worker process).
+            index (tuple, optional): The index of the corpus built beforehand with Corpus.get_index,
+                e.g. incrementally from a previous one. Defaults to building it.
         """
-        self.term_freq_matrix = corpus.get_tf_matrix()
-        self.vocab = corpus.get_vocab()
+        _, _, self.vocab, self.term_freq_matrix = index or corpus.get_index(n_jobs)
+        self.vocab2id = {word: i for i, word in enumerate(self.vocab)}
         self.corpus = corpus
-        self.doc_vectors = self.calculate_tfidf_matrix().toarray()
+        doc_freq = np.bincount(self.term_freq_matrix.indices, minlength=self.term_freq_matrix.shape[1])
+        self.idf = np.log((1 + self.term_freq_matrix.shape[0]) / (1 + doc_freq)) + 1
+        self.doc_vectors = self.calculate_tfidf_matrix()
+        self.term_postings = self.doc_vectors.tocsc()
+        self.doc_norms = np.sqrt(np.asarray(self.doc_vectors.multiply(self.doc_vectors).sum(axis=1)).ravel())
+        self.doc_lengths = np.array([len(doc.body.split()) for doc in corpus.id2doc.values()], dtype=float)
+        docs = list(corpus.id2doc.values())
+        self.sources, self.source_codes = np.unique([doc.source for doc in docs], return_inverse=True)
+        self.authors, self.author_codes = np.unique([doc.author.name for doc in docs], return_inverse=True)
+        dates = to_datetime(Series([doc.date for doc in docs], dtype=object).astype(str), utc=True, format="mixed",
+                            errors="coerce")
+        self.months, self.month_codes = np.unique(dates.dt.strftime("%Y-%m").fillna("unknown").to_numpy(dtype=str),
+                                                  return_inverse=True)
+        self.field_index = {}
+        for field, texts in (("title", [doc.title for doc in docs]), ("author", [doc.author.name for doc in docs])):
+            field_vocab, field_matrix = build_tf_matrix(texts, corpus.stop_words, n_jobs=1)
+            self.field_index[field] = ({word: i for i, word in enumerate(field_vocab)}, field_matrix.tocsc())
+        self.pruning_stats = {"postings": self.term_freq_matrix.nnz, "kept_postings": self.term_freq_matrix.nnz}
+        self.pruned_postings = csc_matrix(self.term_freq_matrix.shape, dtype=bool)
+        if prune_threshold > 0:
+            self.prune(prune_threshold)
+        self.token_offsets = {}
+        for doc_id, (tokens, starts, ends) in corpus.get_token_offsets().items():
+            # Stop words are not in the vocabulary and are skipped by the snippets
+            kept = np.fromiter((token in self.vocab2id for token in tokens), dtype=bool, count=len(tokens))
+            term_ids = np.array([self.vocab2id[token] for token in tokens if token in self.vocab2id], dtype=np.int64)
+            self.token_offsets[doc_id] = (term_ids, starts[kept], ends[kept])
 
     def calculate_tfidf_matrix(self):
         """
@@ -49,9 +103,30 @@ class SearchEngine:
         Returns:
             csr_matrix: The TF-IDF matrix.
         """
-        doc_freq = np.bincount(self.term_freq_matrix.indices, minlength=self.term_freq_matrix.shape[1])
-        idf = np.log((1 + self.term_freq_matrix.shape[0]) / (1 + doc_freq)) + 1
-        return self.term_freq_matrix.multiply(idf)
+        tf = self.term_freq_matrix
+        return csr_matrix((tf.data * self.idf[tf.indices], tf.indices, tf.indptr), shape=tf.shape)
+
+    def prune(self, threshold):
+        """
+        Statically prune the index by dropping the postings whose contribution to the cosine similarity
+        of their document (TF-IDF weight divided by the document norm) is below a threshold.
+
+        Args:
+            threshold (float): The minimum contribution of the postings kept in the index.
+        """
+        norms = np.repeat(self.doc_norms, np.diff(self.doc_vectors.indptr))
+        impact = np.divide(self.doc_vectors.data, norms, out=np.zeros_like(self.doc_vectors.data), where=norms > 0)
+        tf = self.term_freq_matrix
+        kept = impact >= threshold
+        # Only the presence of the dropped postings is kept, so the boolean matches stay exact
+        rows = np.repeat(np.arange(tf.shape[0]), np.diff(tf.indptr))
+        self.pruned_postings = csc_matrix((np.ones(np.count_nonzero(~kept), dtype=bool),
+                                           (rows[~kept], tf.indices[~kept])), shape=tf.shape)
+        self.term_freq_matrix = csr_matrix((tf.data * kept, tf.indices, tf.indptr), shape=tf.shape)
+        self.term_freq_matrix.eliminate_zeros()
+        self.doc_vectors = self.calculate_tfidf_matrix()
+        self.term_postings = self.doc_vectors.tocsc()
+        self.pruning_stats["kept_postings"] = self.term_freq_matrix.nnz
 
     def get_vector(self, query):
         """
@@ -66,62 +141,122 @@ class SearchEngine:
         cleaned_query = self.corpus.clean_text(query)
         query_vector = np.zeros(len(self.vocab))
         for term in cleaned_query.split():
-            if term in self.vocab:
-                query_vector[self.vocab.index(term)] += 1
+            if term in self.vocab2id:
+                query_vector[self.vocab2id[term]] += 1
         return query_vector
 
-    def basic_search(self, query, source_list=None):
+    def get_source_mask(self, source_list=None):
+        """
+        Get the mask of the documents coming from a list of sources.
+
+        Args:
+            source_list (list, optional): List of sources to keep. Defaults to all the sources.
+
+        Returns:
+            numpy.ndarray: A boolean array, True for the documents to keep.
+        """
+        if not source_list:
+            return np.ones(len(self.source_codes), dtype=bool)
+        return np.isin(self.source_codes, np.flatnonzero(np.isin(self.sources, list(source_list))))
+
+    def get_postings(self, word, field=None):
+        """
+        Get the postings of a word, in all the data of the documents or in a single field.
+
+        Args:
+            word (str): The cleaned word.
+            field (str, optional): The field ("title" or "author"). Defaults to all the data of the documents.
+
+        Returns:
+            numpy.ndarray: The sorted indexes of the documents containing the word,
+                including the postings dropped by the static pruning.
+        """
+        vocab2id, postings = (self.vocab2id, self.term_postings) if field is None else self.field_index[field]
+        term = vocab2id.get(word)
+        if term is None:
+            return np.array([], dtype=postings.indices.dtype)
+        matches = postings.indices[postings.indptr[term]:postings.indptr[term + 1]]
+        if field is None and self.pruned_postings.nnz:
+            pruned = self.pruned_postings
+            matches = np.union1d(matches, pruned.indices[pruned.indptr[term]:pruned.indptr[term + 1]])
+        return matches
+
+    def score(self, query_vector, mode="bm25", k=1.5, b=0.65, rows=None):
+        """
+        Score the documents against a query vector.
+
+        Args:
+            query_vector (numpy.ndarray): The query vector.
+            mode (str, optional): The scoring ("basic" for TF, "advanced" for TF-IDF or "bm25"). Default is "bm25".
+            k (float, optional): The k parameter for BM25. Default is 1.5.
+            b (float, optional): The b parameter for BM25. Default is 0.65.
+            rows (numpy.ndarray, optional): The indexes of the only documents to score. Defaults to all the documents.
+
+        Returns:
+            numpy.ndarray: The score of each document, 0 for the documents not scored.
+        """
+        tf_matrix, doc_vectors, doc_norms, doc_lengths = (self.term_freq_matrix, self.doc_vectors, self.doc_norms,
+                                                          self.doc_lengths)
+        if rows is not None:
+            tf_matrix, doc_vectors, doc_norms, doc_lengths = (tf_matrix[rows], doc_vectors[rows], doc_norms[rows],
+                                                              doc_lengths[rows])
+        if mode == "basic":
+            scores = tf_matrix.dot(query_vector)
+        elif mode == "advanced":
+            query_vector = query_vector * self.idf
+            norms = np.linalg.norm(query_vector) * doc_norms
+            dot_product = doc_vectors.dot(query_vector)
+            scores = np.divide(dot_product, norms, out=np.zeros_like(dot_product), where=norms > 0)
+        else:
+            # Only the postings of the query terms are read, see bm25_score for the formula
+            terms = np.flatnonzero(query_vector)
+            postings = (self.term_postings if rows is None else doc_vectors)[:, terms].tocoo()
+            avg_doc_length = self.doc_lengths.mean() if len(self.doc_lengths) else 0
+            length_norm = k * ((1 - b) + b * (doc_lengths[postings.row] / avg_doc_length))
+            tf = postings.data / (postings.data + length_norm)
+            weights = tf * self.idf[terms][postings.col] * query_vector[terms][postings.col]
+            scores = np.bincount(postings.row, weights=weights, minlength=doc_vectors.shape[0])
+        if rows is None:
+            return scores
+        similarity = np.zeros(self.term_freq_matrix.shape[0])
+        similarity[rows] = scores
+        return similarity
+
+    def basic_search(self, query, source_list=None, top_k=None, snippet_size=None):
         """
         Perform a basic search on the corpus using cosine similarity.
 
         Args:
             query (str): The search query.
             source_list (list, optional): List of sources to filter the search results.
+            top_k (int, optional): The maximum number of results to return. Defaults to all the results.
+            snippet_size (int, optional): When set, return highlighted snippets of this many tokens instead of the bodies.
 
         Returns:
             DataFrame: The search results.
         """
         query_vector = self.get_vector(query)
-        similarity = self.term_freq_matrix.dot(query_vector)
-        results = []
-        for i, score in tqdm(enumerate(similarity), ascii=True, desc="Searching (Basic)"):
-            if source_list and self.corpus.id2doc[i + 1].source not in source_list:
-                continue
-            if score > 0:
-                doc = self.corpus.id2doc[i+1]
-                results.append([doc.body, score, doc.title, doc.author.name, doc.date, doc.url, doc.get_data()])
-        results.sort(key=lambda x: x[1], reverse=True)
-        return DataFrame(results, columns=["Body", "Score", "Title", "Author", "Date", "URL", "Document"])
-
-    def advanced_search(self, query, source_list=None):
+        similarity = self.score(query_vector, "basic")
+        return self.build_results(similarity, source_list, query_vector, top_k, snippet_size)
+
+    def advanced_search(self, query, source_list=None, top_k=None, snippet_size=None):
         """
         Perform an advanced search on the corpus using TF-IDF and cosine similarity.
 
         Args:
             query (str): The search query.
             source_list (list, optional): List of sources to filter the search results.
+            top_k (int, optional): The maximum number of results to return. Defaults to all the results.
+            snippet_size (int, optional): When set, return highlighted snippets of this many tokens instead of the bodies.
 
         Returns:
             DataFrame: The search results.
         """
         query_vector = self.get_vector(query)
-        doc_freq = np.bincount(self.term_freq_matrix.indices, minlength=self.term_freq_matrix.shape[1])
-        idf = np.log((1 + self.term_freq_matrix.shape[0]) / (1 + doc_freq)) + 1
-        query_vector *= idf
-        query_vector_norm = np.linalg.norm(query_vector)
-        results = []
-        for i in tqdm(range(self.doc_vectors.shape[0]), ascii=True, desc="Searching (Advanced)"):
-            if source_list and self.corpus.id2doc[i + 1].source not in source_list:
-                continue
-            doc_vector = self.doc_vectors[i]
-            similarity = np.dot(query_vector, doc_vector) / (query_vector_norm * np.linalg.norm(doc_vector))
-            if similarity > 0:
-                doc = self.corpus.id2doc[i+1]
-                results.append([doc.body, similarity, doc.title, doc.author.name, doc.date, doc.url, doc.get_data()])
-        results.sort(key=lambda x: x[1], reverse=True)
-        return DataFrame(results, columns=["Body", "Score", "Title", "Author", "Date", "URL", "Document"])
-
-    def bm25_search(self, query, k=1.5, b=0.65, source_list=None):
+        similarity = self.score(query_vector, "advanced")
+        return self.build_results(similarity, source_list, query_vector * self.idf, top_k, snippet_size)
+
+    def bm25_search(self, query, k=1.5, b=0.65, source_list=None, top_k=None, snippet_size=None):
         """
         Perform a search on the corpus using the BM25 algorithm.
 
@@ -130,25 +265,174 @@ class SearchEngine:
             k (float, optional): The k parameter for BM25. Default is 1.5.
             b (float, optional): The b parameter for BM25. Default is 0.65.
             source_list (list, optional): List of sources to filter the search results.
+            top_k (int, optional): The maximum number of results to return. Defaults to all the results.
+            snippet_size (int, optional): When set, return highlighted snippets of this many tokens instead of the bodies.
 
         Returns:
             DataFrame: The search results.
         """
         query_vector = self.get_vector(query)
-        idf = np.log((1 + self.term_freq_matrix.shape[0]) / (1 + np.bincount(self.term_freq_matrix.indices))) + 1
-        avg_doc_length = np.mean([len(doc.body.split()) for doc in self.corpus.id2doc.values()])
-        results = []
-        for i in tqdm(range(self.doc_vectors.shape[0]), ascii=True, desc="Searching (BM25)"):
-            if source_list and self.corpus.id2doc[i + 1].source not in source_list:
-                continue
-            doc_vector = self.doc_vectors[i]
-            doc_length = len(self.corpus.id2doc[i + 1].body.split())
-            similarity = bm25_score(query_vector, doc_vector, idf, doc_length, avg_doc_length, k, b)
-            if similarity > 0:
-                doc = self.corpus.id2doc[i + 1]
-                results.append([doc.body, similarity, doc.title, doc.author.name, doc.date, doc.url, doc.get_data()])
-        results.sort(key=lambda x: x[1], reverse=True)
-        return DataFrame(results, columns=["Body", "Score", "Title", "Author", "Date", "URL", "Document"])
+        similarity = self.score(query_vector, "bm25", k, b)
+        return self.build_results(similarity, source_list, query_vector * self.idf, top_k, snippet_size)
+
+    def boolean_search(self, query, mode="bm25", k=1.5, b=0.65, source_list=None, top_k=None, snippet_size=None):
+        """
+        Perform a search on the corpus with the boolean query language (see BooleanQuery.QueryParser),
+        for example: covid AND (vaccine OR mask) -title:trump +author:clinton
+
+        The matching documents are found from the postings of the query terms first,
+        then only them are scored, with the positive terms of the query.
+
+        Args:
+            query (str): The boolean search query.
+            mode (str, optional): The scoring ("basic" for TF, "advanced" for TF-IDF or "bm25"). Default is "bm25".
+            k (float, optional): The k parameter for BM25. Default is 1.5.
+            b (float, optional): The b parameter for BM25. Default is 0.65.
+            source_list (list, optional): List of sources to filter the search results.
+            top_k (int, optional): The maximum number of results to return. Defaults to all the results.
+            snippet_size (int, optional): When set, return highlighted snippets of this many tokens instead of the bodies.
+
+        Returns:
+            DataFrame: The search results.
+
+        Raises:
+            ValueError: If the parentheses of the query are unbalanced.
+        """
+        root = QueryParser(self.corpus.tokenize).parse(query)
+        candidates = QueryPlanner(self.get_postings, self.term_freq_matrix.shape[0]).execute(root)
+        query_vector = np.zeros(len(self.vocab))
+        for term in positive_terms(root):
+            if term.word in self.vocab2id:
+                query_vector[self.vocab2id[term.word]] += 1
+        similarity = self.score(query_vector, mode, k, b, candidates)
+        weights = query_vector if mode == "basic" else query_vector * self.idf
+        # The candidates match even when they score 0, e.g. for a query with only excluded terms
+        return self.build_results(similarity, source_list, weights, top_k, snippet_size, candidates)
+
+    def build_results(self, similarity, source_list, query_vector, top_k=None, snippet_size=None, matched=None):
+        """
+        Build the search results table from the scores of the documents.
+
+        The snippets are only built for the documents kept after sorting and truncating the results.
+        The facets of all the matching documents are stored in the "facets" entry of the attrs of the table,
+        the source facet ignoring the source filter, and their number in the "total" entry.
+
+        Args:
+            similarity (numpy.ndarray): The score of each document.
+            source_list (list): List of sources to filter the search results.
+            query_vector (numpy.ndarray): The weighted query vector, used to pick the snippet windows.
+            top_k (int, optional): The maximum number of results to return. Defaults to all the results.
+            snippet_size (int, optional): When set, return highlighted snippets of this many tokens instead of the bodies.
+            matched (numpy.ndarray, optional): The indexes of the matching documents, before the source filter.
+                Defaults to the documents scoring more than 0.
+
+        Returns:
+            DataFrame: The search results, with the full body and data of the documents, or their snippet.
+        """
+        if matched is None:
+            unfiltered = similarity > 0
+        else:
+            unfiltered = np.zeros(len(similarity), dtype=bool)
+            unfiltered[matched] = True
+        matches = np.flatnonzero(unfiltered & self.get_source_mask(source_list))
+        facets, total = self.get_facets(matches, np.flatnonzero(unfiltered)), len(matches)
+        matches = matches[np.argsort(-similarity[matches], kind="stable")]
+        if top_k is not None:
+            matches = matches[:top_k]
+        rows = []
+        for i in matches:
+            doc_id, score = int(i) + 1, similarity[i]
+            doc = self.corpus.id2doc[doc_id]
+            if snippet_size:
+                rows.append([self.get_snippet(doc_id, query_vector, snippet_size), score, doc.title, doc.author.name,
+                             doc.date, doc.url, doc_id])
+            else:
+                rows.append([doc.body, score, doc.title, doc.author.name, doc.date, doc.url, doc.get_data(), doc_id])
+        if snippet_size:
+            results = DataFrame(rows, columns=["Snippet", "Score", "Title", "Author", "Date", "URL", "Id"])
+        else:
+            results = DataFrame(rows, columns=["Body", "Score", "Title", "Author", "Date", "URL", "Document", "Id"])
+        results.attrs["facets"] = facets
+        results.attrs["total"] = total
+        return results
+
+    def get_facets(self, matches, unfiltered_matches=None):
+        """
+        Count the matching documents by source, by author and by publication month.
+
+        Args:
+            matches (numpy.ndarray): The indexes of the matching documents in the term frequency matrix.
+            unfiltered_matches (numpy.ndarray, optional): The indexes of the matching documents before the source
+                filter, counted by the source facet so every source shows its hits. Defaults to matches.
+
+        Returns:
+            dict: A dictionary mapping "source", "author" and "date" to dictionaries of hit counts,
+                sorted by decreasing count for the sources and authors and by month for the dates.
+        """
+        if unfiltered_matches is None:
+            unfiltered_matches = matches
+        facets = {}
+        for name, values, codes, counted in (("source", self.sources, self.source_codes, unfiltered_matches),
+                                             ("author", self.authors, self.author_codes, matches),
+                                             ("date", self.months, self.month_codes, matches)):
+            counts = np.bincount(codes[counted], minlength=len(values))
+            hits = np.flatnonzero(counts)
+            if name != "date":
+                hits = hits[np.argsort(-counts[hits], kind="stable")]
+            facets[name] = {str(values[i]): int(counts[i]) for i in hits}
+        return facets
+
+    def get_snippet(self, doc_id, query_vector, snippet_size=30, highlight=("<b>", "</b>")):
+        """
+        Build a query-biased snippet of the body of a document.
+
+        The snippet is the window of snippet_size tokens with the highest total query weight,
+        found from the token offsets computed at indexing time, with the query terms highlighted.
+        The text of the body is HTML escaped, so the snippet can be rendered as HTML.
+
+        Args:
+            doc_id (int): The ID of the document.
+            query_vector (numpy.ndarray): The weighted query vector.
+            snippet_size (int, optional): The number of tokens of the snippet. Defaults to 30.
+            highlight (tuple, optional): The strings inserted before and after each query term.
+                Defaults to ("<b>", "</b>").
+
+        Returns:
+            str: The highlighted snippet.
+        """
+        body = self.corpus.id2doc[doc_id].body
+        term_ids, starts, ends = self.token_offsets[doc_id]
+        if not len(term_ids):
+            return html.escape(body[:200])
+        weights = query_vector[term_ids]
+        size = min(snippet_size, len(term_ids))
+        window_weights = np.convolve(weights, np.ones(size), mode="valid")
+        first = int(np.argmax(window_weights))
+        last = first + size - 1
+        pieces = ["..." if first > 0 else ""]
+        position = starts[first]
+        for j in np.flatnonzero(weights[first:last + 1] > 0) + first:
+            pieces += [html.escape(body[position:starts[j]]), highlight[0], html.escape(body[starts[j]:ends[j]]),
+                       highlight[1]]
+            position = ends[j]
+        pieces.append(html.escape(body[position:ends[last]]))
+        if last < len(term_ids) - 1:
+            pieces.append("...")
+        return "".join(pieces)
+
+    def get_document(self, doc_id):
+        """
+        Get the full text of a document, to fetch it on demand from a snippet search result.
+
+        Args:
+            doc_id (int): The ID of the document.
+
+        Returns:
+            dict: The title, author, date, URL, source and full body of the document.
+        """
+        doc = self.corpus.id2doc[doc_id]
+        return {"Title": doc.title, "Author": doc.author.name, "Date": doc.date, "URL": doc.url,
+                "Source": doc.source, "Body": doc.body}
 
     def get_distinct_sources_list(self):
         """
@@ -157,7 +441,7 @@ class SearchEngine:
         Returns:
             list: A list of distinct sources.
         """
-        return self.corpus.get_distinct_sources_list()
+        return self.sources.tolist()
 
 def bm25_score(query_vector, doc_vector, idf, doc_length, avg_doc_length, k, b):
     """
@@ -176,4 +460,22 @@ def bm25_score(query_vector, doc_vector, idf, doc_length, avg_doc_length, k, b):
         float: The BM25 score.
     """
     tf = doc_vector / (doc_vector + k * ((1 - b) + b * (doc_length / avg_doc_length)))
-    return np.sum(tf * idf * query_vector)
\ No newline at end of file
+    return np.sum(tf * idf * query_vector)
+
+def overlap_at_k(reference, results, k=10):
+    """
+    Calculate the share of the top k documents of a reference ranking also found in the top k of another ranking,
+    to measure the ranking quality lost by pruning the index.
+
+    Args:
+        reference (DataFrame): The reference search results, for example from an unpruned index.
+        results (DataFrame): The search results to compare to the reference.
+        k (int, optional): The number of top documents compared. Default is 10.
+
+    Returns:
+        float: The overlap between the two top k, between 0 and 1 (1 when the reference is empty).
+    """
+    reference_ids = set(reference["Id"].head(k))
+    if not reference_ids:
+        return 1.0
+    return len(reference_ids & set(results["Id"].head(k))) / len(reference_ids)
@@ -0,0 +1,408 @@
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import logging
+import os
+import pickle
+import time
+from collections import deque
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from Corpus import Corpus
+from SearchEngine import SearchEngine
+
+logger = logging.getLogger(__name__)
+
+SEARCH_MODES = ("basic", "advanced", "bm25")
+
+# Search engine installed in each worker process of the pool
+_worker_engine: Optional[SearchEngine] = None
+
+
+def _init_worker(search_engine: SearchEngine):
+    """
+    Installs the search engine in a worker process.
+
+    Args:
+        search_engine (SearchEngine): The search engine used by the worker.
+    """
+    global _worker_engine
+    _worker_engine = search_engine
+
+
+def _run_query(mode: str, query: str, top_k: int, source_list: Optional[List[str]], k: float, b: float,
+               snippet_size: int, boolean: bool):
+    """
+    Runs a query on the search engine of the current worker process.
+
+    Args:
+        mode (str): The search mode ("basic", "advanced" or "bm25").
+        query (str): The search query.
+        top_k (int): The maximum number of results to return (0 or less for all).
+        source_list (list, optional): List of sources to filter the search results.
+        k (float): The k parameter for BM25.
+        b (float): The b parameter for BM25.
+        snippet_size (int): The number of tokens of the snippets (0 or less for the full bodies).
+        boolean (bool): Whether the query uses the boolean query language.
+
+    Returns:
+        dict: The total number of matching documents, the JSON serializable search results and their facets.
+    """
+    top_k = top_k if top_k > 0 else None
+    snippet_size = snippet_size if snippet_size > 0 else None
+    if boolean:
+        results = _worker_engine.boolean_search(query, mode, k, b, source_list, top_k, snippet_size)
+    elif mode == "basic":
+        results = _worker_engine.basic_search(query, source_list, top_k, snippet_size)
+    elif mode == "advanced":
+        results = _worker_engine.advanced_search(query, source_list, top_k, snippet_size)
+    else:
+        results = _worker_engine.bm25_search(query, k, b, source_list, top_k, snippet_size)
+    facets, total = results.attrs["facets"], results.attrs["total"]
+    results = results.drop(columns=["Document"], errors="ignore")
+    return {
+        "total": total,
+        "results": [
+            {key: (float(value) if key == "Score" else int(value) if key == "Id" else str(value))
+             for key, value in row.items()}
+            for row in results.to_dict(orient="records")
+        ],
+        "facets": facets,
+    }
+
+
+def load_search_engine(path: str) -> SearchEngine:
+    """
+    Loads a pickled corpus and builds a search engine on it.
+
+    Args:
+        path (str): The path of the pickled corpus.
+
+    Returns:
+        SearchEngine: The search engine built on the loaded corpus.
+    """
+    with open(path, "rb") as f:
+        corpus: Corpus = pickle.load(f)
+    return SearchEngine(corpus)
+
+
+class LatencyTracker:
+    """
+    A class to keep track of the latency of the recent queries.
+
+    Attributes:
+        window (int): The number of recent queries kept per mode.
+        latencies (dict): A dictionary mapping search modes to their recent latencies in milliseconds.
+        counts (dict): A dictionary mapping search modes to their total number of queries.
+    """
+
+    def __init__(self, window=1000):
+        """
+        Constructs all the necessary attributes for the LatencyTracker object.
+
+        Args:
+            window (int, optional): The number of recent queries kept per mode. Defaults to 1000.
+        """
+        self.window = window
+        self.latencies: Dict[str, deque] = {}
+        self.counts: Dict[str, int] = {}
+
+    def record(self, mode: str, latency_ms: float):
+        """
+        Records the latency of a query.
+
+        Args:
+            mode (str): The search mode of the query.
+            latency_ms (float): The latency of the query in milliseconds.
+        """
+        self.latencies.setdefault(mode, deque(maxlen=self.window)).append(latency_ms)
+        self.counts[mode] = self.counts.get(mode, 0) + 1
+
+    def summary(self):
+        """
+        Summarizes the recorded latencies.
+
+        Returns:
+            dict: A dictionary mapping search modes to their latency statistics.
+        """
+        summary = {}
+        for mode, latencies in self.latencies.items():
+            values = np.fromiter(latencies, dtype=float)
+            summary[mode] = {
+                "count": self.counts[mode],
+                "mean_ms": float(values.mean()),
+                "p50_ms": float(np.percentile(values, 50)),
+                "p95_ms": float(np.percentile(values, 95)),
+                "max_ms": float(values.max()),
+            }
+        return summary
+
+
+class SearchServer:
+    """
+    A class to represent a local HTTP/JSON search service.
+
+    The queries are scored in a pool of worker processes, each one holding a copy of the search engine,
+    so concurrent requests do not serialize on a single interpreter.
+
+    Attributes:
+        search_engine (SearchEngine): The search engine currently served.
+        host (str): The host the server listens on.
+        port (int): The port the server listens on (0 picks a free port when started).
+        max_workers (int): The number of worker processes used for scoring.
+        generation (int): The number of indexes loaded so far, incremented on every reload.
+        latency (LatencyTracker): The latency statistics of the served queries.
+        corpus_path (str): The pickled corpus reloaded by default by POST /reload.
+        reload_dir (str): The directory holding the other pickled corpora POST /reload may load.
+    """
+
+    def __init__(self, search_engine: SearchEngine, host="127.0.0.1", port=8080, max_workers=None,
+                 corpus_path=None, reload_dir=None):
+        """
+        Constructs all the necessary attributes for the SearchServer object.
+
+        Args:
+            search_engine (SearchEngine): The search engine to serve.
+            host (str, optional): The host to listen on. Defaults to "127.0.0.1".
+            port (int, optional): The port to listen on. Defaults to 8080.
+            max_workers (int, optional): The number of worker processes. Defaults to the number of CPUs.
+            corpus_path (str, optional): The pickled corpus reloaded by default by POST /reload.
+            reload_dir (str, optional): The directory holding the other pickled corpora POST /reload may load.
+                Unpickling runs arbitrary code, so no other path is ever loaded. Defaults to none.
+        """
+        self.search_engine = search_engine
+        self.host = host
+        self.port = port
+        self.max_workers = max_workers
+        self.corpus_path = corpus_path
+        self.reload_dir = reload_dir
+        self.generation = 1
+        self.latency = LatencyTracker()
+        self.started_at = time.time()
+        self._pool = self._create_pool(search_engine)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._in_flight = 0
+        self._reload_lock = asyncio.Lock()
+
+    def _create_pool(self, search_engine: SearchEngine):
+        return concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                                      initargs=(search_engine,))
+
+    async def start(self):
+        """
+        Starts listening for connections.
+        """
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Search server listening on http://{self.host}:{self.port}")
+
+    async def serve_forever(self):
+        """
+        Starts the server and serves requests until cancelled.
+        """
+        if self._server is None:
+            await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        """
+        Stops listening for connections and shuts down the worker pool.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await asyncio.get_running_loop().run_in_executor(None, self._pool.shutdown)
+
+    async def search(self, query: str, mode="bm25", top_k=10, source_list=None, k=1.5, b=0.65, snippet_size=30,
+                     boolean=False):
+        """
+        Runs a query in the worker pool.
+
+        Args:
+            query (str): The search query.
+            mode (str, optional): The search mode ("basic", "advanced" or "bm25"). Defaults to "bm25".
+            top_k (int, optional): The maximum number of results to return (0 or less for all). Defaults to 10.
+            source_list (list, optional): List of sources to filter the search results.
+            k (float, optional): The k parameter for BM25. Default is 1.5.
+            b (float, optional): The b parameter for BM25. Default is 0.65.
+            snippet_size (int, optional): The number of tokens of the snippets (0 or less for the full bodies).
+                Defaults to 30.
+            boolean (bool, optional): Whether the query uses the boolean query language. Defaults to False.
+
+        Returns:
+            dict: The total number of matching documents, the search results and their facets
+                (hit counts by source, author and publication month).
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode {mode!r}, expected one of {', '.join(SEARCH_MODES)}")
+        # The pool is captured before awaiting so a concurrent reload does not affect this query
+        pool = self._pool
+        start_time = time.perf_counter()
+        self._in_flight += 1
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                pool, _run_query, mode, query, top_k, source_list, k, b, snippet_size, boolean)
+        finally:
+            self._in_flight -= 1
+        self.latency.record(mode, (time.perf_counter() - start_time) * 1000)
+        return results
+
+    async def reload(self, search_engine: SearchEngine):
+        """
+        Serves a new search engine without dropping the queries in flight.
+
+        The new worker pool is created before being swapped in, and the old one is only shut down
+        once the queries it already accepted are finished.
+
+        Args:
+            search_engine (SearchEngine): The new search engine to serve.
+        """
+        async with self._reload_lock:
+            loop = asyncio.get_running_loop()
+            new_pool = self._create_pool(search_engine)
+            old_pool, self._pool = self._pool, new_pool
+            self.search_engine = search_engine
+            self.generation += 1
+            logger.info(f"Index reloaded (generation {self.generation})")
+            await loop.run_in_executor(None, old_pool.shutdown)
+
+    async def reload_from_file(self, path: str):
+        """
+        Loads a pickled corpus and serves it without dropping the queries in flight.
+
+        Args:
+            path (str): The path of the pickled corpus.
+        """
+        search_engine = await asyncio.get_running_loop().run_in_executor(None, load_search_engine, path)
+        await self.reload(search_engine)
+
+    def is_reloadable(self, path: str) -> bool:
+        """
+        Checks whether a pickled corpus may be loaded by POST /reload.
+
+        Args:
+            path (str): The path of the pickled corpus.
+
+        Returns:
+            bool: True for the configured corpus path or a file inside the configured reload directory.
+        """
+        real_path = os.path.realpath(path)
+        if self.corpus_path and real_path == os.path.realpath(self.corpus_path):
+            return True
+        return bool(self.reload_dir) and os.path.dirname(real_path) == os.path.realpath(self.reload_dir)
+
+    def health(self):
+        """
+        Gets the health of the server.
+
+        Returns:
+            dict: The status of the server and of the served index.
+        """
+        return {
+            "status": "ok",
+            "generation": self.generation,
+            "documents": self.search_engine.term_freq_matrix.shape[0],
+            "vocabulary": len(self.search_engine.vocab),
+            "in_flight": self._in_flight,
+            "uptime_s": round(time.time() - self.started_at, 3),
+        }
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            status, payload = await self._dispatch(method, target, body)
+        except (ValueError, KeyError, TypeError, asyncio.IncompleteReadError) as e:
+            status, payload = 400, {"error": str(e)}
+        except Exception as e:
+            logger.exception(f"Error while handling request: {e}")
+            status, payload = 500, {"error": "Internal server error"}
+        data = json.dumps(payload).encode("utf-8")
+        writer.write(f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                     f"Content-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\n"
+                     f"Connection: close\r\n\r\n".encode("latin-1") + data)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method: str, target: str, body: bytes):
+        url = urlsplit(target)
+        params = {key: values if key == "source" else values[-1] for key, values in parse_qs(url.query).items()}
+        if body:
+            payload = json.loads(body)
+            if not isinstance(payload, dict):
+                raise ValueError("The JSON body must be an object")
+            params.update(payload)
+        if url.path == "/health" and method == "GET":
+            return 200, self.health()
+        if url.path == "/latency" and method == "GET":
+            return 200, self.latency.summary()
+        if url.path == "/search" and method in ("GET", "POST"):
+            mode = params.get("mode", "bm25")
+            if mode not in SEARCH_MODES:
+                return 400, {"error": f"Unknown search mode {mode!r}"}
+            query = params.get("q", "")
+            if not isinstance(query, str):
+                raise ValueError("The query must be a string")
+            source_list = params.get("source")
+            if isinstance(source_list, str):
+                source_list = [source_list]
+            results = await self.search(query, mode, int(params.get("top_k", 10)), source_list,
+                                        float(params.get("k", 1.5)), float(params.get("b", 0.65)),
+                                        int(params.get("snippet", 30)),
+                                        str(params.get("boolean", False)).lower() in ("1", "true"))
+            return 200, {"generation": self.generation, "count": len(results["results"]), **results}
+        if url.path == "/document" and method == "GET":
+            doc_id = int(params.get("id", 0))
+            if doc_id not in self.search_engine.corpus.id2doc:
+                return 404, {"error": f"No document with id {doc_id}"}
+            return 200, {key: str(value) for key, value in self.search_engine.get_document(doc_id).items()}
+        if url.path == "/reload" and method == "POST":
+            path = params.get("path", self.corpus_path)
+            if not path:
+                return 400, {"error": "Missing corpus path"}
+            if not self.is_reloadable(path):
+                return 403, {"error": f"Reloading {path} is not allowed"}
+            await self.reload_from_file(path)
+            return 200, self.health()
+        return 404, {"error": f"No route for {method} {url.path}"}
+
+
+_REASONS = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 500: "Internal Server Error"}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve a pickled corpus over HTTP/JSON")
+    parser.add_argument("--corpus", default="corpus.pkl", help="path of the pickled corpus")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=None, help="number of scoring processes")
+    parser.add_argument("--reload-dir", default=None, help="directory of the other corpora POST /reload may load")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    server = SearchServer(load_search_engine(args.corpus), args.host, args.port, args.workers, args.corpus,
+                          args.reload_dir)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
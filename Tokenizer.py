@@ -0,0 +1,43 @@
+import re
+from typing import FrozenSet, List
+
+# Matches the tokens kept by clean_text, case-insensitively so the offsets point into the original text
+TOKEN_PATTERN = re.compile(r"[a-zà-ÿ@^]+", re.IGNORECASE)
+
+# Common English words, present in almost every document, that can be left out of the index
+ENGLISH_STOP_WORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between both but by
+can could did do does doing down during each few for from further had has have having he her here hers herself him
+himself his how i if in into is it its itself just me more most my myself no nor not now of off on once only or other
+our ours ourselves out over own s same she should so some such t than that the their theirs them themselves then there
+these they this those through to too under until up very was we were what when where which while who whom why will
+with would you your yours yourself yourselves
+""".split())
+
+
+def clean_text(text: str) -> str:
+    """
+    Cleans the text by converting to lowercase and removing non-alphabetic characters.
+
+    Args:
+        text (str): The text to clean.
+
+    Returns:
+        str: The cleaned text.
+    """
+    text = text.lower().replace("\n", " ")
+    return re.sub(r"[^a-zà-ÿ@^\s]", " ", text).strip()
+
+
+def tokenize(text: str, stop_words: FrozenSet[str] = frozenset()) -> List[str]:
+    """
+    Splits the text into the cleaned words kept in the index, leaving out the stop words.
+
+    Args:
+        text (str): The text to tokenize.
+        stop_words (FrozenSet[str], optional): The words to leave out. Defaults to no stop words.
+
+    Returns:
+        list: The indexed words of the text.
+    """
+    return [word for word in clean_text(text).split() if word not in stop_words]
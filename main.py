@@ -10,8 +10,9 @@ import urllib3
 import xmltodict
 
 from Author import Author
-from Corpus import Corpus
+from Corpus import Corpus, ENGLISH_STOP_WORDS
 from Document import Document
+from FetchCache import FetchCache
 from SearchEngine import SearchEngine
 
 # Dictionary to store documents with their IDs
@@ -26,44 +27,153 @@ reddit_client = praw.Reddit(client_id='T9qPLZ2H3esl_ukXzn0UVA', client_secret='z
                             user_agent='search_engine_td')
 
 
-def reddit_import(subject: str, nb_doc: int):
+def register_document(key: str, doc: Document):
+    """
+    Adds a document to the imported documents, linking it to the shared author of the same name.
+
+    Args:
+        key (str): The ID of the document.
+        doc (Document): The document to add.
+    """
+    author_name = doc.author.name
+    if author_name not in id2aut:
+        id2aut[author_name] = Author(author_name)
+    doc.author = id2aut[author_name]
+    id2doc[key] = doc
+    id2aut[author_name].add_document(doc)
+
+
+def reddit_item(submission) -> dict:
+    """
+    Extracts the raw fields of a reddit submission.
+
+    Args:
+        submission (praw.models.Submission): The reddit submission.
+
+    Returns:
+        dict: The JSON serializable fields of the submission.
+    """
+    return {
+        "id": submission.id,
+        "title": submission.title,
+        "author": submission.author.name if submission.author else "Unknown",
+        "created_utc": submission.created_utc,
+        "edited": submission.edited,
+        "url": submission.url,
+        "selftext": submission.selftext,
+    }
+
+
+def parse_reddit_item(item: dict) -> Document:
+    """
+    Builds a document from the raw fields of a reddit submission.
+
+    Args:
+        item (dict): The raw fields of the submission.
+
+    Returns:
+        Document: The document of the submission.
+    """
+    date = pd.to_datetime(int(item["created_utc"]), utc=True, unit='s')
+    return Document(item["title"], Author(item["author"]), date, item["url"], item["selftext"], "reddit")
+
+
+def reddit_import(subject: str, nb_doc: int, cache: FetchCache = None):
     """
     Imports documents from a specified subreddit.
 
     Args:
         subject (str): The subreddit to import from.
         nb_doc (int): The number of documents to import.
+        cache (FetchCache, optional): The cache of the fetched items, only the new or changed ones are parsed.
     """
-    for key, submission in enumerate(reddit_client.subreddit(subject).hot(limit=nb_doc)):
-        author_name = submission.author.name if submission.author else "Unknown"
-        if author_name not in id2aut:
-            id2aut[author_name] = Author(author_name)
-        date = pd.to_datetime(int(submission.created_utc), utc=True, unit='s')
-        doc = Document(submission.title, id2aut[author_name], date, submission.url, submission.selftext, "reddit")
-        id2doc[f"red{key}-{subject}"] = doc
-        id2aut[author_name].add_document(doc)
+    items = cache.get_listing("reddit", subject, nb_doc) if cache else None
+    if items is None:
+        # The hot listing gives the current version of every submission: the edited ones get a new digest
+        # and the deleted ones leave the listing
+        items = [(submission.id, reddit_item(submission))
+                 for submission in reddit_client.subreddit(subject).hot(limit=nb_doc)]
+        if cache:
+            items = cache.update_listing("reddit", subject, nb_doc, items, complete=True)
+    for key, (remote_id, item) in enumerate(items):
+        if cache:
+            doc = cache.refresh("reddit", remote_id, item, parse_reddit_item, str(item["edited"] or item["created_utc"]))
+        else:
+            doc = parse_reddit_item(item)
+        register_document(f"red{key}-{subject}", doc)
 
 
-def arxiv_import(subject: str, nb_doc: int):
+def arxiv_items(subject: str, nb_doc: int, since: str = None, page_size=50) -> List[dict]:
     """
-    Imports documents from arXiv based on a search query.
+    Fetches the raw entries of an arXiv search query, most recently updated first.
+
+    Args:
+        subject (str): The search query for arXiv.
+        nb_doc (int): The maximum number of entries to fetch.
+        since (str, optional): The update date of the newest cached entry, the fetch stops at the first entry
+            not updated after it. Defaults to None (fetch nb_doc entries).
+        page_size (int, optional): The number of entries per request. Defaults to 50.
+
+    Returns:
+        list: The entries of the arXiv feed updated after since.
+    """
+    articles = []
+    while len(articles) < nb_doc:
+        max_results = min(page_size, nb_doc - len(articles))
+        resp = urllib3.request('GET', f'http://export.arxiv.org/api/query?search_query=all:{subject}'
+                                      f'&sortBy=lastUpdatedDate&sortOrder=descending'
+                                      f'&start={len(articles)}&max_results={max_results}')
+        page = xmltodict.parse(resp.data)['feed'].get('entry', [])
+        page = page if isinstance(page, list) else [page]
+        for article in page:
+            if since is not None and article['updated'] <= since:
+                return articles
+            articles.append(article)
+        if len(page) < max_results:
+            break
+    return articles
+
+
+def parse_arxiv_item(article: dict) -> Document:
+    """
+    Builds a document from a raw arXiv entry.
+
+    Args:
+        article (dict): The arXiv entry.
+
+    Returns:
+        Document: The document of the entry.
+    """
+    title = article['title'].replace("\n", " ")
+    summary = article['summary'].replace("\n", " ")
+    author_name = article['author'][0]['name'] if isinstance(article['author'], list) else article['author']['name']
+    date = pd.to_datetime(article['published'])
+    return Document(title, Author(author_name), date, article['id'], summary, "arxiv")
+
+
+def arxiv_import(subject: str, nb_doc: int, cache: FetchCache = None):
+    """
+    Imports the most recently updated documents from arXiv based on a search query.
 
     Args:
         subject (str): The search query for arXiv.
         nb_doc (int): The number of documents to import.
+        cache (FetchCache, optional): The cache of the fetched items, only the entries updated after
+            the cached ones are fetched and only the new or changed ones are parsed.
     """
-    resp = urllib3.request('GET', f'http://export.arxiv.org/api/query?search_query=all:{subject}&max_results={nb_doc}')
-    articles = xmltodict.parse(resp.data)['feed']['entry']
-    for key, article in enumerate(articles):
-        title = article['title'].replace("\n", " ")
-        summary = article['summary'].replace("\n", " ")
-        author_name = article['author'][0]['name'] if isinstance(article['author'], list) else article['author']['name']
-        if author_name not in id2aut:
-            id2aut[author_name] = Author(author_name)
-        date = pd.to_datetime(article['published'])
-        doc = Document(title, id2aut[author_name], date, article['id'], summary, "arxiv")
-        id2doc[f"arx{key}-{subject}"] = doc
-        id2aut[author_name].add_document(doc)
+    items = cache.get_listing("arxiv", subject, nb_doc) if cache else None
+    if items is None:
+        cached = cache.cached_listing("arxiv", subject, nb_doc) if cache else []
+        since = max((article['updated'] for _, article in cached), default=None)
+        items = [(article['id'], article) for article in arxiv_items(subject, nb_doc, since)]
+        if cache:
+            items = cache.update_listing("arxiv", subject, nb_doc, items)
+    for key, (remote_id, article) in enumerate(items):
+        if cache:
+            doc = cache.refresh("arxiv", remote_id, article, parse_arxiv_item, article.get('updated'))
+        else:
+            doc = parse_arxiv_item(article)
+        register_document(f"arx{key}-{subject}", doc)
 
 
 def us_speeches_import():
@@ -89,18 +199,19 @@ def us_speeches_import():
             counter += 1
 
 
-def build_corpus(subject: List[str], nb: int) -> Corpus:
+def build_corpus(subject: List[str], nb: int, cache: FetchCache = None) -> Corpus:
     """
     Builds a corpus by importing documents from various sources.
 
     Args:
         subject (List[str]): The subject(s) to search for.
         nb (int): The number of documents to import from each source.
+        cache (FetchCache, optional): The cache of the fetched items, saved once the documents are imported.
 
     Returns:
         Corpus: The built corpus containing all imported documents.
     """
-    corpus = Corpus("Main Corpus")
+    corpus = Corpus("Main Corpus", ENGLISH_STOP_WORDS)
     if not subject:
         logger.error("No subject provided, exiting")
         exit(1)
@@ -108,7 +219,7 @@ def build_corpus(subject: List[str], nb: int) -> Corpus:
     def import_reddit_data(sub):
         try:
             logger.info(f"Fetching data for {sub} from reddit")
-            reddit_import(sub, nb)
+            reddit_import(sub, nb, cache)
             logger.info("Success")
         except Exception as e:
             logger.error(f"Error while importing reddit data for {sub}: {e}")
@@ -116,7 +227,7 @@ def build_corpus(subject: List[str], nb: int) -> Corpus:
     def import_arxiv_data(sub):
         try:
             logger.info(f"Fetching data for {sub} from arxiv")
-            arxiv_import(sub, nb)
+            arxiv_import(sub, nb, cache)
             logger.info("Success")
         except Exception as e:
             logger.error(f"Error while importing arxiv data for {sub}: {e}")
@@ -127,6 +238,10 @@ def build_corpus(subject: List[str], nb: int) -> Corpus:
             executor.submit(import_reddit_data, s)
             executor.submit(import_arxiv_data, s)
 
+    if cache:
+        logger.info(f"{len(cache.new)} new, {len(cache.changed)} changed and {len(cache.reused)} cached documents")
+        cache.save()
+
     logger.info("Importing US speeches data")
     us_speeches_import()
 
@@ -135,20 +250,28 @@ def build_corpus(subject: List[str], nb: int) -> Corpus:
     return corpus
 
 
-def get_search_engine(corpus: Corpus) -> SearchEngine:
+def get_search_engine(corpus: Corpus, delta=None) -> SearchEngine:
     """
     Initializes a search engine with the given corpus.
 
     Args:
         corpus (Corpus): The corpus to use for the search engine.
+        delta (list, optional): The new and changed documents of the fetch (FetchCache.delta). When set,
+            the index is built incrementally from the one saved by the previous call and saved for the next one.
+            Defaults to None (the index is built from scratch).
 
     Returns:
         SearchEngine: The initialized search engine.
     """
-    return SearchEngine(corpus)
+    if delta is None:
+        return SearchEngine(corpus)
+    index = corpus.get_index(previous=load_index(), delta=delta)
+    save_index(index)
+    return SearchEngine(corpus, index=index)
 
 
-def init(subject: List[str] | str, nb: int, should_build_corpus: bool) -> SearchEngine:
+def init(subject: List[str] | str, nb: int, should_build_corpus: bool,
+         cache_path: str | None = "fetch_cache.pkl") -> SearchEngine:
     """
     Initializes the search engine, either by building a new corpus or loading an existing one.
 
@@ -156,12 +279,15 @@ def init(subject: List[str] | str, nb: int, should_build_corpus: bool) -> Search
         subject (List[str] | str): The subject(s) to search for.
         nb (int): The number of documents to import from each source.
         should_build_corpus (bool): Whether to build a new corpus or load an existing one.
+        cache_path (str | None, optional): The path of the cache of the fetched items, None to fetch everything.
+            Defaults to "fetch_cache.pkl".
 
     Returns:
         SearchEngine: The initialized search engine.
     """
     coloredlogs.install(level='INFO')
     start_time = time.time()
+    cache = None
     if should_build_corpus:
         logger.info("Building corpus")
         if nb < 1:
@@ -178,7 +304,8 @@ def init(subject: List[str] | str, nb: int, should_build_corpus: bool) -> Search
             logger.info(f"Fetching {nb} documents from each source for {subject[0]}")
         else:
             logger.info(f"Fetching {nb} documents from each source for each {len(subject)} subjects")
-        corpus = build_corpus(subject, nb)
+        cache = FetchCache(cache_path) if cache_path else None
+        corpus = build_corpus(subject, nb, cache)
         save_corpus(corpus)
     else:
         logger.warning("should_build_corpus is set to False, loading corpus from file")
@@ -186,7 +313,7 @@ def init(subject: List[str] | str, nb: int, should_build_corpus: bool) -> Search
     logger.info(f"Corpus built in {round(time.time() - start_time, 2)} seconds")
     logger.info("Corpus stats:")
     print(corpus.stats())
-    return get_search_engine(corpus)
+    return get_search_engine(corpus, cache.delta if cache else None)
 
 
 def save_corpus(corpus: Corpus):
@@ -213,6 +340,33 @@ def load_corpus() -> Corpus:
         return pickle.load(f)
 
 
+def save_index(index):
+    """
+    Saves the index of a search engine to a file, to build the next one incrementally.
+
+    Args:
+        index (tuple): The index to save (Corpus.get_index).
+    """
+    import pickle
+    with open("index.pkl", "wb") as f:
+        pickle.dump(index, f)
+
+
+def load_index():
+    """
+    Loads the index saved by the previous incremental build from a file.
+
+    Returns:
+        tuple: The loaded index, None if there is no saved index.
+    """
+    import os
+    import pickle
+    if not os.path.exists("index.pkl"):
+        return None
+    with open("index.pkl", "rb") as f:
+        return pickle.load(f)
+
+
 if __name__ == '__main__':
     a = init(["usa", "covid19", "stocks", "homeowners"], 100, True)
     print(a)
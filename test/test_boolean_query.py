@@ -0,0 +1,79 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from BooleanQuery import And, Bool, Not, Or, QueryParser, QueryPlanner, Term, positive_terms
+from Corpus import Corpus, ENGLISH_STOP_WORDS
+
+
+class TestBooleanQuery(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = QueryParser(Corpus("Test Corpus", ENGLISH_STOP_WORDS).tokenize)
+        self.postings = {
+            ("covid", None): np.array([0, 1, 2, 3]),
+            ("vaccine", None): np.array([1, 3]),
+            ("mask", None): np.array([2, 4]),
+            ("trump", "author"): np.array([3, 4]),
+            ("rare", None): np.array([5]),
+        }
+
+    def get_postings(self, word, field):
+        return self.postings.get((word, field), np.array([], dtype=np.int64))
+
+    def execute(self, query):
+        return QueryPlanner(self.get_postings, 6).execute(self.parser.parse(query)).tolist()
+
+    def test_parses_operators_and_fields(self):
+        self.assertEqual(repr(self.parser.parse("covid AND (vaccine OR mask) -author:Trump +title:x-ray")),
+                         "[+(title:x AND title:ray) (covid AND (vaccine OR mask)) -author:trump]")
+
+    def test_parses_not_as_exclusion_and_drops_stop_words(self):
+        root = self.parser.parse("NOT the covid AND NOT mask")
+        self.assertEqual(repr(root), "[(covid AND NOT mask)]")
+        self.assertIsInstance(root.should[0], And)
+        self.assertEqual(repr(self.parser.parse("NOT mask")), "[-mask]")
+
+    def test_ignores_empty_groups(self):
+        self.assertEqual(repr(self.parser.parse("() (the) mask")), "[mask]")
+
+    def test_rejects_unbalanced_parentheses(self):
+        with self.assertRaises(ValueError):
+            self.parser.parse("(covid OR mask")
+        with self.assertRaises(ValueError):
+            self.parser.parse("covid) mask")
+
+    def test_matches_bag_of_words_as_union(self):
+        self.assertEqual(self.execute("vaccine mask"), [1, 2, 3, 4])
+
+    def test_intersects_and_excludes(self):
+        self.assertEqual(self.execute("covid AND (vaccine OR mask)"), [1, 2, 3])
+        self.assertEqual(self.execute("+covid -author:trump"), [0, 1, 2])
+        self.assertEqual(self.execute("covid AND NOT vaccine"), [0, 2])
+        self.assertEqual(self.execute("-covid"), [4, 5])
+
+    def test_matches_nothing_without_terms(self):
+        for query in ("", "the", "+the", "and OR the", "NOT", "( )"):
+            self.assertEqual(self.execute(query), [], query)
+        self.assertEqual(self.execute("the -covid"), [4, 5])
+
+    def test_short_circuits_empty_intersections(self):
+        self.assertEqual(self.execute("+rare +covid +vaccine"), [])
+        with mock.patch.object(np, "intersect1d", wraps=np.intersect1d) as intersect:
+            result = QueryPlanner(self.get_postings, 6).execute(And([Term("covid"), Term("unknown")]))
+        self.assertEqual(len(result), 0)
+        self.assertEqual(intersect.call_count, 0)
+
+    def test_orders_intersections_by_document_frequency(self):
+        planner = QueryPlanner(self.get_postings, 6)
+        self.assertEqual(sorted([Term("covid"), Term("rare"), Or([Term("vaccine"), Term("mask")])],
+                                key=planner.cost)[0].word, "rare")
+
+    def test_gets_positive_terms(self):
+        root = Bool([Term("covid")], [Or([Term("mask"), Not(Term("vaccine"))])], [Term("rare")])
+        self.assertEqual([term.word for term in positive_terms(root)], ["covid", "mask"])
+
+
+if __name__ == '__main__':
+    unittest.main()
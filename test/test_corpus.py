@@ -3,7 +3,7 @@ import unittest
 import numpy as np
 
 from Author import Author
-from Corpus import Corpus
+from Corpus import Corpus, ENGLISH_STOP_WORDS
 from Document import Document
 from SearchEngine import SearchEngine, cosine_similarity, bm25_score
 
@@ -57,6 +57,13 @@ class TestCorpus(unittest.TestCase):
         tf_matrix = self.corpus.get_tf_matrix()
         self.assertEqual(tf_matrix.shape, (2, len(self.corpus.get_vocab())))
 
+    def test_leaves_stop_words_out_of_index(self):
+        corpus = Corpus("Stop Words Corpus", ENGLISH_STOP_WORDS)
+        corpus.add(self.doc1)
+        self.assertEqual(corpus.tokenize("This is a TEST document!"), ["test", "document"])
+        self.assertNotIn("this", corpus.get_vocab())
+        self.assertEqual(corpus.get_tf_matrix().sum(), 5)
+
     def test_shows_documents_correctly(self):
         self.corpus.show()
         self.assertIn("Title1", repr(self.corpus))
@@ -0,0 +1,212 @@
+import os
+import pickle
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+
+import IndexBuilder
+import main
+from Corpus import Corpus
+from FetchCache import FetchCache
+from SearchEngine import SearchEngine
+
+# Recorded response of http://export.arxiv.org/api/query?search_query=all:linux
+# &sortBy=lastUpdatedDate&sortOrder=descending&start=0&max_results=2
+ARXIV_RESPONSE = b"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <entry>
+    <id>http://arxiv.org/abs/2101.00002v1</id>
+    <updated>2021-01-02T10:00:00Z</updated>
+    <published>2021-01-02T10:00:00Z</published>
+    <title>Linux file systems</title>
+    <summary>A survey of file systems.</summary>
+    <author><name>Grace Hopper</name></author>
+  </entry>
+  <entry>
+    <id>http://arxiv.org/abs/2101.00001v1</id>
+    <updated>2021-01-01T10:00:00Z</updated>
+    <published>2021-01-01T10:00:00Z</published>
+    <title>Scheduling in the Linux
+  kernel</title>
+    <summary>We study the Linux
+  scheduler.</summary>
+    <author><name>Ada Lovelace</name></author>
+    <author><name>Alan Turing</name></author>
+  </entry>
+</feed>
+"""
+
+# The same query after a new version of 2101.00001
+ARXIV_UPDATED_RESPONSE = b"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <entry>
+    <id>http://arxiv.org/abs/2101.00001v1</id>
+    <updated>2021-01-03T10:00:00Z</updated>
+    <published>2021-01-01T10:00:00Z</published>
+    <title>Scheduling in the Linux
+  kernel</title>
+    <summary>We study the Linux
+  scheduler, revised.</summary>
+    <author><name>Ada Lovelace</name></author>
+    <author><name>Alan Turing</name></author>
+  </entry>
+  <entry>
+    <id>http://arxiv.org/abs/2101.00002v1</id>
+    <updated>2021-01-02T10:00:00Z</updated>
+    <published>2021-01-02T10:00:00Z</published>
+    <title>Linux file systems</title>
+    <summary>A survey of file systems.</summary>
+    <author><name>Grace Hopper</name></author>
+  </entry>
+</feed>
+"""
+
+
+def recorded_submission(submission_id, title, selftext, edited=False):
+    return SimpleNamespace(id=submission_id, title=title, author=SimpleNamespace(name="redditor"),
+                           created_utc=1700000000.0, edited=edited, url=f"https://redd.it/{submission_id}",
+                           selftext=selftext)
+
+
+class TestFetchCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "fetch_cache.pkl")
+        main.id2doc.clear()
+        main.id2aut.clear()
+        self.submissions = [recorded_submission("a2", "Second post", "Kernel news"),
+                            recorded_submission("a1", "First post", "Hello linux")]
+        self.reddit = mock.patch.object(main, "reddit_client")
+        self.arxiv = mock.patch.object(main.urllib3, "request", return_value=SimpleNamespace(data=ARXIV_RESPONSE))
+        reddit_client = self.reddit.start()
+        reddit_client.subreddit.return_value.hot.side_effect = lambda limit: iter(self.submissions[:limit])
+        self.arxiv_request = self.arxiv.start()
+
+    def tearDown(self):
+        mock.patch.stopall()
+        self.tmp.cleanup()
+
+    def import_reddit(self, nb):
+        main.id2doc.clear()
+        main.id2aut.clear()
+        cache = FetchCache(self.path, max_age=0)
+        main.reddit_import("linux", nb, cache)
+        cache.save()
+        return cache
+
+    def test_imports_recorded_responses(self):
+        cache = FetchCache(self.path)
+        main.reddit_import("linux", 2, cache)
+        main.arxiv_import("linux", 2, cache)
+        self.assertEqual(len(main.id2doc), 4)
+        arxiv_doc = main.id2doc["arx1-linux"]
+        self.assertEqual(arxiv_doc.title, "Scheduling in the Linux   kernel")
+        self.assertIs(arxiv_doc.author, main.id2aut["Ada Lovelace"])
+        self.assertEqual(main.id2aut["redditor"].ndoc, 2)
+        self.assertEqual(len(cache.new), 4)
+        self.assertEqual(len(cache.delta), 4)
+        self.assertIn("sortBy=lastUpdatedDate&sortOrder=descending", self.arxiv_request.call_args.args[1])
+
+    def test_reuses_cached_listings_without_network(self):
+        cache = FetchCache(self.path)
+        main.arxiv_import("linux", 2, cache)
+        cache.save()
+        cache = FetchCache(self.path)
+        main.arxiv_import("linux", 2, cache)
+        self.assertEqual(self.arxiv_request.call_count, 1)
+        self.assertEqual(len(cache.reused), 2)
+        self.assertEqual(cache.delta, [])
+
+    def test_only_parses_new_or_edited_submissions(self):
+        self.import_reddit(3)
+        self.submissions[0] = recorded_submission("a2", "Second post", "Kernel news, edited", edited=1700000100.0)
+        self.submissions.insert(0, recorded_submission("a3", "Third post", "Fresh news"))
+        with mock.patch.object(main, "parse_reddit_item", wraps=main.parse_reddit_item) as parse:
+            cache = self.import_reddit(3)
+        self.assertEqual(parse.call_count, 2)
+        self.assertEqual(cache.new, [("reddit", "a3")])
+        self.assertEqual(cache.changed, [("reddit", "a2")])
+        self.assertEqual(cache.reused, [("reddit", "a1")])
+        self.assertEqual([doc.body for doc in cache.delta], ["Fresh news", "Kernel news, edited"])
+        self.assertEqual(cache.entries[("reddit", "a2")].updated_at, "1700000100.0")
+
+    def test_drops_deleted_submissions(self):
+        self.import_reddit(2)
+        del self.submissions[0]
+        cache = self.import_reddit(2)
+        self.assertEqual([doc.title for doc in main.id2doc.values()], ["First post"])
+        self.assertEqual(list(cache.entries), [("reddit", "a1")])
+
+    def test_only_fetches_arxiv_entries_updated_after_the_cache(self):
+        cache = FetchCache(self.path, max_age=0)
+        main.arxiv_import("linux", 2, cache)
+        cache.save()
+        self.arxiv_request.return_value = SimpleNamespace(data=ARXIV_UPDATED_RESPONSE)
+        cache = FetchCache(self.path, max_age=0)
+        with mock.patch.object(main, "parse_arxiv_item", wraps=main.parse_arxiv_item) as parse:
+            main.arxiv_import("linux", 2, cache)
+        self.assertEqual(parse.call_count, 1)
+        self.assertEqual(cache.changed, [("arxiv", "http://arxiv.org/abs/2101.00001v1")])
+        self.assertEqual(cache.reused, [("arxiv", "http://arxiv.org/abs/2101.00002v1")])
+        self.assertEqual([doc.body for doc in cache.delta], ["We study the Linux   scheduler, revised."])
+        self.assertEqual(cache.entries[("arxiv", "http://arxiv.org/abs/2101.00001v1")].updated_at,
+                         "2021-01-03T10:00:00Z")
+
+    def test_evicts_unused_listings_with_their_items(self):
+        cache = FetchCache(self.path)
+        main.reddit_import("linux", 2, cache)
+        main.arxiv_import("linux", 2, cache)
+        _, nb, ids = cache.listings[("reddit", "linux")]
+        cache.listings[("reddit", "linux")] = (0.0, nb, ids)
+        cache.save()
+        cache = FetchCache(self.path)
+        self.assertEqual(list(cache.listings), [("arxiv", "linux")])
+        self.assertEqual({source for source, _ in cache.entries}, {"arxiv"})
+        self.assertEqual(len(cache.blobs), 2)
+
+    def test_drops_unreferenced_items_on_save(self):
+        cache = FetchCache(self.path)
+        for body in ("Hello linux", "Hello linux, edited"):
+            item = main.reddit_item(recorded_submission("a1", "First post", body))
+            cache.update_listing("reddit", "linux", 1, [("a1", item)])
+            cache.refresh("reddit", "a1", item, main.parse_reddit_item)
+        cache.save()
+        self.assertEqual([item["selftext"] for item in FetchCache(self.path).blobs.values()], ["Hello linux, edited"])
+
+    def test_does_not_pickle_the_author_graph(self):
+        cache = FetchCache(self.path)
+        main.reddit_import("linux", 2, cache)
+        cache.save()
+        with open(self.path, "rb") as f:
+            _, entries, _ = pickle.load(f)
+        self.assertTrue(all(entry.document.author.production == [] for entry in entries.values()))
+        self.assertEqual(main.id2aut["redditor"].ndoc, 2)
+        self.assertIs(main.id2doc["red0-linux"].author, main.id2aut["redditor"])
+
+    def test_indexes_only_the_delta(self):
+        self.import_reddit(3)
+        corpus = Corpus("Main Corpus", main.ENGLISH_STOP_WORDS)
+        for doc in main.id2doc.values():
+            corpus.add(doc)
+        previous = corpus.get_index()
+        self.submissions.insert(0, recorded_submission("a3", "Third post", "Fresh news"))
+        cache = self.import_reddit(3)
+        corpus = Corpus("Main Corpus", main.ENGLISH_STOP_WORDS)
+        for doc in main.id2doc.values():
+            corpus.add(doc)
+        with mock.patch.object(IndexBuilder, "count_chunk", wraps=IndexBuilder.count_chunk) as count:
+            index = corpus.get_index(previous=previous, delta=cache.delta)
+        self.assertEqual([call.args[0] for call in count.call_args_list], [["Third post redditor Fresh news"]])
+        engine = SearchEngine(corpus, index=index)
+        rebuilt = SearchEngine(corpus)
+        self.assertEqual(engine.vocab, rebuilt.vocab)
+        self.assertTrue(np.array_equal(engine.term_freq_matrix.toarray(), rebuilt.term_freq_matrix.toarray()))
+        self.assertEqual(engine.bm25_search("news")["Id"].tolist(), rebuilt.bm25_search("news")["Id"].tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+
+import numpy as np
+
+from Author import Author
+from Corpus import Corpus, ENGLISH_STOP_WORDS
+from Document import Document
+from IndexBuilder import build_tf_matrix, count_chunk, update_tf_matrix
+from SearchEngine import SearchEngine
+
+
+class TestIndexBuilder(unittest.TestCase):
+
+    def setUp(self):
+        self.corpus = Corpus("Test Corpus")
+        self.author = Author("Test Author")
+        bodies = ["This is a test document.", "Another test document.", "", "Zebras and apples, test test.",
+                  "Une phrase en français.", "Apples again"]
+        for i, body in enumerate(bodies):
+            self.corpus.add(Document(f"Title{i}", self.author, "2023-01-01", f"http://example.com/{i}", body,
+                                     f"source{i % 2}"))
+        self.texts = [doc.get_data() for doc in self.corpus.id2doc.values()]
+
+    def test_counts_chunk_against_local_vocab(self):
+        vocab, block = count_chunk(["b a b", "c"])
+        self.assertEqual(vocab.tolist(), ["a", "b", "c"])
+        self.assertEqual(block.toarray().tolist(), [[1, 2, 0], [0, 0, 1]])
+
+    def test_keeps_local_vocab_as_objects(self):
+        vocab, _ = count_chunk(["a " + "z" * 10000])
+        self.assertEqual(vocab.dtype, object)
+        self.assertEqual(vocab.tolist(), ["a", "z" * 10000])
+
+    def test_streams_texts(self):
+        vocab, tf_matrix = build_tf_matrix((text for text in self.texts), n_jobs=2, chunk_size=4)
+        self.assertEqual(vocab, self.corpus.get_vocab())
+        self.assertTrue(np.array_equal(tf_matrix.toarray(), self.corpus.get_tf_matrix().toarray()))
+
+    def test_matches_serial_index(self):
+        for n_jobs in (1, 2):
+            vocab, tf_matrix = build_tf_matrix(self.texts, n_jobs=n_jobs, chunk_size=2)
+            self.assertEqual(vocab, self.corpus.get_vocab())
+            self.assertTrue(np.array_equal(tf_matrix.toarray(), self.corpus.get_tf_matrix().toarray()))
+
+    def test_leaves_stop_words_out(self):
+        vocab, tf_matrix = build_tf_matrix(self.texts, ENGLISH_STOP_WORDS, n_jobs=2, chunk_size=4)
+        self.assertNotIn("this", vocab)
+        self.assertEqual(tf_matrix.shape, (len(self.texts), len(vocab)))
+
+    def test_handles_empty_corpus(self):
+        vocab, tf_matrix = build_tf_matrix([], n_jobs=2)
+        self.assertEqual(vocab, [])
+        self.assertEqual(tf_matrix.shape, (0, 0))
+
+    def test_does_not_reuse_index_built_with_other_stop_words(self):
+        texts = ["the cat and a dog", "a dog"]
+        previous = update_tf_matrix(texts, n_jobs=1)
+        stop_words, _, vocab, tf_matrix = update_tf_matrix(texts, previous, stop_words=ENGLISH_STOP_WORDS, n_jobs=1)
+        self.assertEqual(stop_words, ENGLISH_STOP_WORDS)
+        self.assertEqual(vocab, ["cat", "dog"])
+        self.assertEqual(tf_matrix.toarray().tolist(), [[1, 1], [0, 1]])
+
+    def test_search_engine_uses_parallel_index(self):
+        serial = SearchEngine(self.corpus).bm25_search("test apples")
+        parallel = SearchEngine(self.corpus, n_jobs=2).bm25_search("test apples")
+        self.assertEqual(serial["Id"].tolist(), parallel["Id"].tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
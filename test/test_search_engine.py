@@ -3,9 +3,9 @@ import unittest
 import numpy as np
 
 from Author import Author
-from Corpus import Corpus
+from Corpus import Corpus, ENGLISH_STOP_WORDS
 from Document import Document
-from SearchEngine import SearchEngine, cosine_similarity, bm25_score
+from SearchEngine import SearchEngine, cosine_similarity, bm25_score, overlap_at_k
 
 
 class TestSearchEngine(unittest.TestCase):
@@ -79,6 +79,118 @@ class TestSearchEngine(unittest.TestCase):
         score = bm25_score(query_vector, doc_vector, idf, 3, 2, 1.5, 0.75)
         self.assertAlmostEqual(score, 1, 1)
 
+    def test_limits_results_to_top_k(self):
+        results = self.search_engine.bm25_search("test", top_k=1)
+        self.assertEqual(len(results), 1)
+
+    def test_returns_highlighted_snippets(self):
+        results = self.search_engine.advanced_search("another", snippet_size=2)
+        self.assertNotIn("Body", results.columns)
+        self.assertEqual(results["Snippet"].iloc[0], "<b>Another</b> test...")
+        self.assertEqual(self.search_engine.get_document(results["Id"].iloc[0])["Body"], "Another test document.")
+
+    def test_picks_best_snippet_window(self):
+        self.corpus.add(Document("Title3", self.author, "2023-01-03", "http://example.com/3",
+                                 "One two three four, a snippet about Search engines here.", "source1"))
+        search_engine = SearchEngine(self.corpus)
+        results = search_engine.basic_search("search engines", snippet_size=4)
+        self.assertEqual(results["Snippet"].iloc[0], "...snippet about <b>Search</b> <b>engines</b>...")
+
+    def test_prunes_low_impact_postings(self):
+        self.corpus.add(Document("Title3", self.author, "2023-01-03", "http://example.com/3",
+                                 "A much longer document about a test of static index pruning.", "source1"))
+        full_engine = SearchEngine(self.corpus)
+        pruned_engine = SearchEngine(self.corpus, prune_threshold=0.2)
+        self.assertEqual(full_engine.pruning_stats["postings"], full_engine.pruning_stats["kept_postings"])
+        self.assertLess(pruned_engine.pruning_stats["kept_postings"], pruned_engine.pruning_stats["postings"])
+        for query in ("pruning", "static index"):
+            self.assertEqual(overlap_at_k(full_engine.bm25_search(query), pruned_engine.bm25_search(query), 1), 1)
+
+    def test_calculates_overlap_at_k_correctly(self):
+        reference = self.search_engine.bm25_search("test")
+        self.assertEqual(overlap_at_k(reference, reference), 1)
+        self.assertEqual(overlap_at_k(reference, self.search_engine.bm25_search("another")), 0.5)
+
+    def test_computes_facets_of_all_matches(self):
+        self.corpus.add(Document("Title3", Author("Other Author"), "2023-02-01", "http://example.com/3",
+                                 "A third test document.", "source1"))
+        results = SearchEngine(self.corpus).bm25_search("test", top_k=1)
+        facets = results.attrs["facets"]
+        self.assertEqual(len(results), 1)
+        self.assertEqual(facets["source"], {"source1": 2, "source2": 1})
+        self.assertEqual(facets["author"], {"Test Author": 2, "Other Author": 1})
+        self.assertEqual(facets["date"], {"2023-01": 2, "2023-02": 1})
+
+    def test_computes_source_facet_before_source_filter(self):
+        results = self.search_engine.basic_search("test", source_list=["source2"])
+        facets = results.attrs["facets"]
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results.attrs["total"], 1)
+        self.assertEqual(facets["source"], {"source1": 1, "source2": 1})
+        self.assertEqual(facets["date"], {"2023-01": 1})
+        self.assertEqual(self.search_engine.get_distinct_sources_list(), ["source1", "source2"])
+
+    def test_performs_boolean_search_correctly(self):
+        self.corpus.add(Document("Special title", Author("Other Author"), "2023-01-03", "http://example.com/3",
+                                 "A third test document.", "source1"))
+        search_engine = SearchEngine(self.corpus)
+        results = search_engine.boolean_search("test -another")
+        self.assertEqual(sorted(results["Title"]), ["Special title", "Title1"])
+        results = search_engine.boolean_search("+document +title:special", mode="advanced")
+        self.assertEqual(results["Title"].tolist(), ["Special title"])
+        results = search_engine.boolean_search("document AND NOT author:other", mode="basic", source_list=["source1"])
+        self.assertEqual(results["Title"].tolist(), ["Title1"])
+
+    def test_scores_boolean_matches_like_ranked_search(self):
+        boolean = self.search_engine.boolean_search("test OR another")
+        ranked = self.search_engine.bm25_search("test another")
+        self.assertEqual(boolean["Id"].tolist(), ranked["Id"].tolist())
+        self.assertTrue(np.allclose(boolean["Score"], ranked["Score"]))
+
+    def test_returns_documents_matching_only_excluded_clauses(self):
+        for query in ("NOT another", "-another"):
+            results = self.search_engine.boolean_search(query, snippet_size=30)
+            self.assertEqual(results["Title"].tolist(), ["Title1"])
+            self.assertEqual(results["Score"].tolist(), [0])
+            self.assertEqual(results.attrs["total"], 1)
+        results = self.search_engine.boolean_search("-missing", source_list=["source2"])
+        self.assertEqual(results["Title"].tolist(), ["Title2"])
+        self.assertEqual(results.attrs["facets"]["source"], {"source1": 1, "source2": 1})
+
+    def test_matches_nothing_for_boolean_queries_without_terms(self):
+        corpus = Corpus("Stop Words Corpus", ENGLISH_STOP_WORDS)
+        corpus.add(self.doc1)
+        corpus.add(self.doc2)
+        search_engine = SearchEngine(corpus)
+        for query in ("", "the"):
+            results = search_engine.boolean_search(query)
+            self.assertEqual(len(results), 0)
+            self.assertEqual(results.attrs["total"], 0)
+
+    def test_keeps_boolean_matches_exact_when_pruning(self):
+        corpus = Corpus("Pruned Corpus")
+        for title, body in (("Covid vaccine", "covid vaccine"),
+                            ("Mask", "mask wearing outdoors indoors masks protect people from many viruses covid"),
+                            ("Other", "nothing related here")):
+            corpus.add(Document(title, self.author, "2023-01-01", "http://example.com", body, "source1"))
+        pruned = SearchEngine(corpus, prune_threshold=0.3)
+        self.assertNotIn(1, pruned.term_postings[:, pruned.vocab2id["covid"]].indices)
+        for engine in (SearchEngine(corpus), pruned):
+            self.assertEqual(engine.boolean_search("-covid")["Title"].tolist(), ["Other"])
+            self.assertEqual(sorted(engine.boolean_search("+covid")["Title"]), ["Covid vaccine", "Mask"])
+            self.assertEqual(engine.boolean_search("+mask -covid")["Title"].tolist(), [])
+
+    def test_handles_empty_boolean_intersection(self):
+        self.assertEqual(len(self.search_engine.boolean_search("+another +this")), 0)
+        self.assertEqual(len(self.search_engine.boolean_search("+missing test")), 0)
+
+    def test_escapes_html_in_snippets(self):
+        self.corpus.add(Document("Title3", self.author, "2023-01-03", "http://example.com/3",
+                                 "Evil <script>alert(1)</script> & test", "source1"))
+        results = SearchEngine(self.corpus).basic_search("evil", snippet_size=10)
+        self.assertEqual(results["Snippet"].iloc[0],
+                         "<b>Evil</b> &lt;script&gt;alert(1)&lt;/script&gt; &amp; test")
+
 
 if __name__ == '__main__':
     unittest.main()
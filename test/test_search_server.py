@@ -0,0 +1,134 @@
+import asyncio
+import json
+import os
+import pickle
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from Author import Author
+from Corpus import Corpus
+from Document import Document
+from SearchEngine import SearchEngine
+from SearchServer import SearchServer
+
+
+class TestSearchServer(unittest.TestCase):
+
+    def setUp(self):
+        self.corpus = Corpus("Test Corpus")
+        self.author = Author("Test Author")
+        self.corpus.add(Document("Title1", self.author, "2023-01-01", "http://example.com/1",
+                                 "This is a test document.", "source1"))
+        self.corpus.add(Document("Title2", self.author, "2023-01-02", "http://example.com/2",
+                                 "Another test document.", "source2"))
+        self.server = SearchServer(SearchEngine(self.corpus), port=0, max_workers=2)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(), self.loop).result()
+
+    def tearDown(self):
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def request(self, path, payload=None):
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        with urllib.request.urlopen(f"http://127.0.0.1:{self.server.port}{path}", data=data) as resp:
+            return json.loads(resp.read())
+
+    def test_reports_health(self):
+        health = self.request("/health")
+        self.assertEqual(health["status"], "ok")
+        self.assertEqual(health["documents"], 2)
+
+    def test_searches_with_every_mode(self):
+        for mode in ("basic", "advanced", "bm25"):
+            response = self.request(f"/search?q=test&mode={mode}&snippet=0")
+            self.assertEqual(response["count"], 2)
+            self.assertIn("This is a test document.", [r["Body"] for r in response["results"]])
+
+    def test_returns_snippets_and_fetches_documents_on_demand(self):
+        result = self.request("/search?q=another")["results"][0]
+        self.assertEqual(result["Snippet"], "<b>Another</b> test document")
+        self.assertNotIn("Body", result)
+        self.assertEqual(self.request(f"/document?id={result['Id']}")["Body"], "Another test document.")
+
+    def test_filters_and_limits_results(self):
+        response = self.request("/search", {"q": "test", "source": ["source1"]})
+        self.assertEqual([r["Title"] for r in response["results"]], ["Title1"])
+        self.assertEqual(response["total"], 1)
+        self.assertEqual(response["facets"]["source"], {"source1": 1, "source2": 1})
+        response = self.request("/search?q=test&top_k=1")
+        self.assertEqual(response["count"], 1)
+        self.assertEqual(response["total"], 2)
+        self.assertEqual(response["facets"]["source"], {"source1": 1, "source2": 1})
+
+    def test_searches_with_boolean_queries(self):
+        response = self.request("/search", {"q": "test -another", "boolean": True})
+        self.assertEqual([r["Title"] for r in response["results"]], ["Title1"])
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            self.request("/search?q=(test&boolean=1")
+        self.assertEqual(ctx.exception.code, 400)
+
+    def test_rejects_malformed_json_bodies(self):
+        for payload in ([1, 2], "test", {"q": "test", "top_k": None}, {"q": 42}, {"q": "test", "k": [1]}):
+            with self.assertRaises(urllib.error.HTTPError) as ctx:
+                self.request("/search", payload)
+            self.assertEqual(ctx.exception.code, 400)
+
+    def test_rejects_unknown_mode(self):
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            self.request("/search?q=test&mode=magic")
+        self.assertEqual(ctx.exception.code, 400)
+
+    def test_serves_concurrent_requests(self):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(executor.map(lambda _: self.request("/search?q=another"), range(16)))
+        self.assertTrue(all(r["count"] == 1 for r in responses))
+        self.assertEqual(self.request("/latency")["bm25"]["count"], 16)
+
+    def test_reloads_index(self):
+        self.corpus.add(Document("Title3", self.author, "2023-01-03", "http://example.com/3",
+                                 "A brand new test document.", "source1"))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "corpus.pkl")
+            with open(path, "wb") as f:
+                pickle.dump(self.corpus, f)
+            self.server.reload_dir = tmp
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                in_flight = [executor.submit(self.request, "/search?q=test") for _ in range(4)]
+                health = self.request("/reload", {"path": path})
+                self.assertTrue(all(f.result()["count"] >= 2 for f in in_flight))
+        self.assertEqual(health["generation"], 2)
+        self.assertEqual(self.request("/search?q=brand")["count"], 1)
+
+    def test_refuses_to_reload_other_paths(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "corpus.pkl")
+            with open(path, "wb") as f:
+                pickle.dump(self.corpus, f)
+            for payload in ({"path": path}, {}):
+                with self.assertRaises(urllib.error.HTTPError) as ctx:
+                    self.request("/reload", payload)
+                self.assertIn(ctx.exception.code, (400, 403))
+            self.server.corpus_path = path
+            self.assertEqual(self.request("/reload", {})["generation"], 2)
+
+    def test_reports_internal_errors(self):
+        async def crash(*args, **kwargs):
+            raise RuntimeError("worker crashed")
+
+        self.server.search = crash
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            self.request("/search?q=test")
+        self.assertEqual(ctx.exception.code, 500)
+
+
+if __name__ == '__main__':
+    unittest.main()